@@ -0,0 +1,9 @@
+"""
+benchmarks
+~~~~~~~~~~~~~~~~~~~~~
+
+Offline benchmarks of the bot, run from the repository root.
+
+:copyright: (c) 2022-present MrSniFo
+:license: MIT, see LICENSE for more details.
+"""
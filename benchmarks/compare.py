@@ -0,0 +1,76 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# Usage:
+#   python -m benchmarks.compare baseline.json results.json --threshold 0.1
+
+from argparse import ArgumentParser
+from json import load
+import sys
+
+# Higher is worse for latencies, lower is worse for throughput.
+METRICS: tuple[tuple[str, int], ...] = (("p50_ms", 1), ("p99_ms", 1), ("ops_per_second", -1))
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    """
+    Prints the change of every metric found in both runs.
+
+    :param threshold:`float` Relative change counted as a regression, 0.1 being 10%.
+    :return:`list[str]` The regressed operation metrics.
+    """
+    regressions: list[str] = []
+    print(f"{'operation':<24}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        for metric, direction in METRICS:
+            old, new = before.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change * direction > threshold
+            if regressed:
+                regressions.append(f"{name}.{metric}")
+            print(f"{name:<24}{metric:<16}{old:>12}{new:>12}{change:>+10.1%}{'  !' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compares two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("results")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as fp:
+        baseline = load(fp)
+    with open(args.results, encoding="utf-8") as fp:
+        results = load(fp)
+    if baseline.get("parameters") != results.get("parameters"):
+        print("Warning: the runs used different parameters.", file=sys.stderr)
+    regressions = compare(baseline=baseline, results=results, threshold=args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
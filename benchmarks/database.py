@@ -0,0 +1,171 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# Usage:
+#   python -m benchmarks.database --codes 1000000 --redemptions 5000000 --output results.json
+#   python -m benchmarks.database --source bench.db --output results.json
+
+from core.models import Pool, Errors, CodeGenerator
+from benchmarks.seed import seed, add_arguments, USER_BASE, CHANNEL_BASE, ROLE_BASE
+from benchmarks.stats import Recorder, write_results, print_results
+from argparse import ArgumentParser
+from asyncio import gather, run
+from random import Random
+from shutil import copyfile
+from tempfile import TemporaryDirectory
+from time import perf_counter, time
+from typing import Awaitable, Callable
+import sqlite3
+import os
+
+
+def samples(database: str, count: int, rng: Random) -> tuple[list[tuple[int, str]], list[int]]:
+    """
+    Picks random existing codes and guilds of the database.
+
+    :return:`tuple` (guild_id, code) pairs and guild ids.
+    """
+    connection = sqlite3.connect(database)
+    try:
+        last_code = connection.execute("""SELECT MAX(id) FROM codes;""").fetchone()[0]
+        codes: list[tuple[int, str]] = []
+        while len(codes) < count:
+            ids = [rng.randint(1, last_code) for _ in range(count - len(codes))]
+            sql = f"""SELECT guild_id, code FROM codes WHERE id IN ({", ".join("?" * len(ids))});"""
+            codes.extend(connection.execute(sql, ids).fetchall())
+        guilds = [row[0] for row in connection.execute("""SELECT id FROM guilds;""")]
+    finally:
+        connection.close()
+    rng.shuffle(codes)
+    return codes, [rng.choice(guilds) for _ in range(count)]
+
+
+async def measure(pool: Pool, recorder: Recorder, items: list, call: Callable[..., Awaitable],
+                  concurrency: int = 1) -> None:
+    """
+    Runs `call(db, item)` for every item, each on its own pooled connection.
+    """
+    pending = iter(items)
+
+    async def worker() -> None:
+        for item in pending:
+            started = perf_counter()
+            async with pool.acquire() as db:
+                try:
+                    await call(db, item)
+                except Errors.CodeNotFound:
+                    pass
+            recorder.add(perf_counter() - started)
+
+    with recorder:
+        await gather(*(worker() for _ in range(concurrency)))
+
+
+async def sweep(pool: Pool) -> tuple[Recorder, int]:
+    """
+    Removes every due redemption, timing each page.
+
+    :return:`tuple` The page latencies and the number of handled redemptions.
+    """
+    recorder = Recorder(name="expired_roles")
+    rows = 0
+    async with pool.acquire() as db:
+        with recorder:
+            started = perf_counter()
+            async for page in db.expired_roles(now=int(time())):
+                rows += len(page)
+                await db.delete_redemptions(rowids=[user.rowid for user in page])
+                recorder.add(perf_counter() - started)
+                started = perf_counter()
+    return recorder, rows
+
+
+async def benchmark(database: str, operations: int, concurrency: int, seed_value: int) -> dict:
+    rng = Random(seed_value + 1)
+    codes, guilds = samples(database=database, count=operations, rng=rng)
+    missing = [(guild_id, code[::-1] + "-MISSING") for guild_id, code in codes]
+    created = [(guild_id, f"BENCH-{code}") for (guild_id, _), code in
+               zip(codes, CodeGenerator().generate(count=operations))]
+    # Users past the seeded range never redeemed anything.
+    users = [USER_BASE + 10 ** 9 + i for i in range(operations)]
+    results: dict = {}
+
+    pool = Pool(database=database)
+    opened = Recorder(name="pool_open")
+    with opened:
+        started = perf_counter()
+        await pool.open()
+        opened.add(perf_counter() - started)
+    results[opened.name] = opened.summary()
+    try:
+        runs = (("get_code", codes, lambda db, item: db.get_code(guild_id=item[0], code=item[1])),
+                ("get_code_missing", missing, lambda db, item: db.get_code(guild_id=item[0], code=item[1])),
+                ("redeem", list(zip(codes, users)),
+                 lambda db, item: db.redeem(guild_id=item[0][0], code=item[0][1], user_id=item[1])),
+                ("create_code", created,
+                 lambda db, item: db.create_code(guild_id=item[0], code=item[1], expire_in=None, max_uses=None,
+                                                 role_id=ROLE_BASE, role_expire_time=3600)),
+                ("remove_code", created, lambda db, item: db.remove_code(guild_id=item[0], code=item[1])),
+                ("set_channel", guilds,
+                 lambda db, item: db.set_channel(guild_id=item, channel_id=CHANNEL_BASE + rng.randrange(10))))
+        for name, items, call in runs:
+            recorder = Recorder(name=name)
+            await measure(pool=pool, recorder=recorder, items=items, call=call, concurrency=concurrency)
+            results[name] = recorder.summary()
+        results["get_code"]["cache_hit_rate"] = round(pool.codes.hits / max(1, pool.codes.hits + pool.codes.misses), 4)
+        recorder, rows = await sweep(pool=pool)
+        results[recorder.name] = recorder.summary()
+        results[recorder.name]["rows"] = rows
+    finally:
+        await pool.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmarks the Database layer against a synthetic guilds.db.")
+    parser.add_argument("--source", help="seeded database to copy instead of seeding a new one")
+    parser.add_argument("--operations", type=int, default=1000, help="calls per operation")
+    parser.add_argument("--concurrency", type=int, default=1, help="calls in flight at once")
+    parser.add_argument("--output", help="JSON file the results are written to")
+    add_arguments(parser=parser)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        database = os.path.join(directory, "guilds.db")
+        parameters = {"operations": args.operations, "concurrency": args.concurrency}
+        if args.source:
+            # Working on a copy, the benchmark writes to the database.
+            copyfile(args.source, database)
+            parameters["source"] = os.path.basename(args.source)
+        else:
+            started = perf_counter()
+            parameters.update(seed(database=database, guilds=args.guilds, codes=args.codes,
+                                   redemptions=args.redemptions, expired=args.expired, users=args.users,
+                                   seed_value=args.seed))
+            print(f"Seeded in {perf_counter() - started:.1f}s.")
+        results = run(benchmark(database=database, operations=args.operations, concurrency=args.concurrency,
+                                seed_value=args.seed))
+    print_results(results=results)
+    if args.output:
+        write_results(path=args.output, parameters=parameters, results=results)
@@ -0,0 +1,289 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# ------ Discord ------
+from discord import Embed, HTTPException, InteractionResponded, ui
+# ------ Async ------
+from asyncio import sleep
+from collections import Counter, deque
+from random import Random
+from time import perf_counter
+from types import SimpleNamespace
+
+
+class FakeHTTPResponse(object):
+    __slots__ = ('status', 'reason')
+
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        self.reason = reason
+
+
+class FakeAPI(object):
+    __slots__ = ('latency', 'jitter', 'rate_limit', 'retry_after', 'buckets', 'calls', 'limited',
+                 '_rng', '_history')
+
+    # discord.py gives up on a request after this many tries.
+    tries: int = 5
+
+    def __init__(self, latency: float = 0.08, jitter: float = 0.04, rate_limit: float = 0.0,
+                 retry_after: float = 1.0, buckets: dict[str, tuple[int, float]] | None = None,
+                 rng: Random | None = None):
+        """
+        Stands in for the Discord HTTP API, every request only sleeps.
+
+        Rate limited requests are retried after `retry_after` the way
+        discord.py does it, so a 429 costs a round trip plus the wait.
+
+        :param latency:`float` Seconds every request takes.
+        :param jitter:`float` Random seconds added on top of `latency`.
+        :param rate_limit:`float` Chance that any request is answered with a 429.
+        :param retry_after:`float` Seconds a random 429 asks to wait.
+        :param buckets:`dict` Route to (requests, seconds) allowed per guild.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.buckets = buckets or {}
+        self.calls: Counter[str] = Counter()
+        self.limited: Counter[str] = Counter()
+        self._rng = rng or Random()
+        self._history: dict[tuple[str, int], deque[float]] = {}
+
+    def _retry_after(self, route: str, key: int) -> float | None:
+        if route in self.buckets:
+            limit, per = self.buckets[route]
+            history = self._history.setdefault((route, key), deque())
+            now = perf_counter()
+            while history and now - history[0] >= per:
+                history.popleft()
+            if len(history) >= limit:
+                return history[0] + per - now
+            history.append(now)
+        if self._rng.random() < self.rate_limit:
+            return self.retry_after
+        return None
+
+    async def request(self, route: str, key: int = 0) -> None:
+        for _ in range(self.tries):
+            await sleep(self.latency + self._rng.random() * self.jitter)
+            retry_after = self._retry_after(route=route, key=key)
+            if retry_after is None:
+                self.calls[route] += 1
+                return
+            self.limited[route] += 1
+            await sleep(retry_after)
+        raise HTTPException(FakeHTTPResponse(status=429, reason="Too Many Requests"), "rate limited")
+
+
+class FakeRole(object):
+    __slots__ = ('id', 'position')
+
+    def __init__(self, role_id: int, position: int):
+        self.id = role_id
+        self.position = position
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+    def __gt__(self, other: "FakeRole") -> bool:
+        return self.position > other.position
+
+    def __lt__(self, other: "FakeRole") -> bool:
+        return self.position < other.position
+
+
+class FakeMember(object):
+    __slots__ = ('id', 'guild', 'roles', 'added', 'removed', 'avatar')
+
+    def __init__(self, member_id: int, guild: "FakeGuild", roles: list[FakeRole] | None = None):
+        self.id = member_id
+        self.guild = guild
+        self.roles: list[FakeRole] = roles or []
+        # perf_counter of the last add and removal of each role.
+        self.added: dict[int, float] = {}
+        self.removed: dict[int, float] = {}
+        self.avatar = None
+
+    def __str__(self) -> str:
+        return f"user{self.id}"
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    @property
+    def top_role(self) -> FakeRole:
+        return max(self.roles, key=lambda role: role.position, default=self.guild.default_role)
+
+    async def add_roles(self, *roles: FakeRole, atomic: bool = True) -> None:
+        for _ in (roles if atomic else roles[:1]):
+            await self.guild.api.request(route="member_roles", key=self.guild.id)
+        for role in roles:
+            self.roles.append(role)
+            self.added[role.id] = perf_counter()
+
+    async def remove_roles(self, *roles: FakeRole, atomic: bool = True) -> None:
+        for _ in (roles if atomic else roles[:1]):
+            await self.guild.api.request(route="member_roles", key=self.guild.id)
+        for role in roles:
+            if role in self.roles:
+                self.roles.remove(role)
+            self.removed[role.id] = perf_counter()
+
+
+class FakeChannel(object):
+    __slots__ = ('id', 'guild', 'messages')
+
+    def __init__(self, channel_id: int, guild: "FakeGuild"):
+        self.id = channel_id
+        self.guild = guild
+        self.messages: int = 0
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    async def send(self, content: str | None = None, **kwargs) -> None:
+        await self.guild.api.request(route="channel_messages", key=self.id)
+        self.messages += 1
+
+
+class FakeGuild(object):
+    __slots__ = ('id', 'api', 'default_role', 'roles', 'members', 'channels')
+
+    def __init__(self, guild_id: int, api: FakeAPI):
+        self.id = guild_id
+        self.api = api
+        self.default_role = FakeRole(role_id=guild_id, position=0)
+        self.roles: dict[int, FakeRole] = {}
+        self.members: dict[int, FakeMember] = {}
+        self.channels: dict[int, FakeChannel] = {}
+
+    def get_role(self, role_id: int) -> FakeRole | None:
+        return self.roles.get(role_id)
+
+    def get_member(self, member_id: int) -> FakeMember | None:
+        return self.members.get(member_id)
+
+    def get_channel(self, channel_id: int) -> FakeChannel | None:
+        return self.channels.get(channel_id)
+
+
+def outcome(embed: Embed | None) -> str:
+    """
+    Names a reply after its embed, error embeds after their message.
+    """
+    if embed is None:
+        return "no embed"
+    if embed.title:
+        return embed.title
+    # embed_wrong puts the message after a fixed first line.
+    lines = (embed.description or "").splitlines()
+    return lines[1] if len(lines) > 1 else lines[0] if lines else "empty embed"
+
+
+class FakeResponse(object):
+    __slots__ = ('interaction',)
+
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    def is_done(self) -> bool:
+        return self.interaction.acked is not None
+
+    async def _callback(self, result: str) -> None:
+        if self.is_done():
+            raise InteractionResponded(self.interaction)
+        await self.interaction.guild.api.request(route="interaction_callback")
+        self.interaction.acked = perf_counter()
+        self.interaction.outcome = result
+
+    async def send_message(self, content: str | None = None, *, embed: Embed | None = None, **kwargs) -> None:
+        await self._callback(result=outcome(embed=embed))
+
+    async def defer(self, **kwargs) -> None:
+        await self._callback(result="deferred")
+
+    async def send_modal(self, modal: ui.Modal) -> None:
+        await self._callback(result="modal")
+        self.interaction.modal = modal
+
+
+class FakeFollowup(object):
+    __slots__ = ('interaction',)
+
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def send(self, content: str | None = None, *, embed: Embed | None = None, **kwargs) -> None:
+        await self.interaction.guild.api.request(route="followup")
+        self.interaction.outcome = outcome(embed=embed)
+
+
+class FakeInteraction(object):
+    __slots__ = ('client', 'guild', 'user', 'created', 'acked', 'outcome', 'modal', 'extras', 'response',
+                 'followup')
+
+    def __init__(self, client, guild: FakeGuild, user: FakeMember, created: float | None = None):
+        """
+        :param created:`float` perf_counter of the click, the 3 second deadline starts there.
+        """
+        self.client = client
+        self.guild = guild
+        self.user = user
+        self.created: float = perf_counter() if created is None else created
+        self.acked: float | None = None
+        self.outcome: str | None = None
+        self.modal: ui.Modal | None = None
+        self.extras: dict = {}
+        self.response = FakeResponse(interaction=self)
+        self.followup = FakeFollowup(interaction=self)
+
+    @property
+    def guild_id(self) -> int:
+        return self.guild.id
+
+
+class FakeBot(object):
+    __slots__ = ('pool', 'dispatcher', 'logger', 'metrics', 'user', 'guilds')
+
+    def __init__(self, pool, dispatcher, logger, metrics, user_id: int):
+        """
+        The attributes of core.bot.Bot the cogs use.
+        """
+        self.pool = pool
+        self.dispatcher = dispatcher
+        self.logger = logger
+        self.metrics = metrics
+        self.user = SimpleNamespace(id=user_id)
+        self.guilds: dict[int, FakeGuild] = {}
+
+    def get_guild(self, guild_id: int) -> FakeGuild | None:
+        return self.guilds.get(guild_id)
+
+    async def wait_until_ready(self) -> None:
+        return None
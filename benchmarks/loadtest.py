@@ -0,0 +1,385 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# Usage:
+#   python -m benchmarks.loadtest --users 5000 --duration 10
+#   python -m benchmarks.loadtest --users 2000 --duration 5 --mix redeem=90,code=4,create=2,remove=2,log=2
+#   python -m benchmarks.loadtest --users 1000 --role-duration 5 --role-limit 10/10 --rate-limit 0.01
+#   python -m benchmarks.loadtest --users 5000 --duration 10 --storage memory
+
+from core.models import Pool, MemoryPool, Database, Dispatcher, Metrics
+from core.cogs.code import Code
+from core.cogs.create import Create
+from core.cogs.logging import Logging
+from core.cogs.loop import Loop
+from core.cogs.redeem import Redeem
+from core.cogs.remove import Remove
+from benchmarks.fakes import FakeAPI, FakeBot, FakeChannel, FakeGuild, FakeInteraction, FakeMember, FakeRole
+from benchmarks.seed import GUILD_BASE, CHANNEL_BASE, ROLE_BASE, USER_BASE
+from benchmarks.stats import Recorder, write_results
+# ------ Async ------
+from asyncio import create_task, gather, run, sleep
+from argparse import ArgumentParser
+from collections import Counter
+from contextlib import asynccontextmanager
+from logging import getLogger
+from random import Random
+from shutil import copyfile
+from sqlite3 import OperationalError
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import AsyncIterator
+import os
+
+# Discord drops interactions that are not answered within this many seconds.
+DEADLINE: float = 3.0
+BOT_ID: int = 940_000_000_000_000_000
+ADMIN_ID: int = 950_000_000_000_000_000
+
+
+class InstrumentedPool(object):
+    __slots__ = ('pool', 'wait', 'hold', 'locked', '_lent')
+
+    def __init__(self, pool: Pool | MemoryPool):
+        """
+        Wraps the pool of any storage engine, timing how long operations wait for and hold it.
+        """
+        self.pool = pool
+        self.wait = Recorder(name="pool_wait")
+        self.hold = Recorder(name="pool_hold")
+        # "database is locked" errors, sqlite gave up waiting for a writer.
+        self.locked: int = 0
+        self._lent: dict = {}
+
+    def __getattr__(self, name: str):
+        return getattr(self.pool, name)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator:
+        started = perf_counter()
+        async with self.pool.acquire() as db:
+            lazy = isinstance(db, Database)
+            if lazy:
+                # Sqlite connections are borrowed on the first statement, timed in lend and release.
+                db.pool = self
+            acquired = perf_counter()
+            if not lazy:
+                self.wait.add(acquired - started)
+            try:
+                yield db
+            except OperationalError as error:
+                if "locked" in str(error):
+                    self.locked += 1
+                raise
+            finally:
+                if not lazy:
+                    self.hold.add(perf_counter() - acquired)
+
+    async def lend(self):
+        started = perf_counter()
+        connection = await self.pool.lend()
+        self._lent[connection] = perf_counter()
+        self.wait.add(self._lent[connection] - started)
+        return connection
+
+    async def release(self, connection) -> None:
+        self.hold.add(perf_counter() - self._lent.pop(connection))
+        await self.pool.release(connection=connection)
+
+
+class Harness(object):
+    __slots__ = ('args', 'rng', 'api', 'bot', 'cogs', 'admins', 'codes', 'spare', 'ack', 'total',
+                 'outcomes', 'errors', 'missed')
+
+    def __init__(self, args, bot: FakeBot, api: FakeAPI):
+        self.args = args
+        self.rng = Random(args.seed)
+        self.api = api
+        self.bot = bot
+        self.cogs: dict = {}
+        self.admins: dict[int, FakeMember] = {}
+        # Shared code of every guild.
+        self.codes: dict[int, str] = {}
+        # Codes left for /remove.
+        self.spare: dict[int, list[str]] = {}
+        self.ack: dict[str, Recorder] = {}
+        self.total: dict[str, Recorder] = {}
+        self.outcomes: dict[str, Counter] = {}
+        self.errors: Counter[str] = Counter()
+        self.missed: Counter[str] = Counter()
+
+    async def setup(self, removes: int) -> None:
+        """
+        Builds the guilds and their codes, then loads the cogs.
+        """
+        role_duration = self.args.role_duration
+        for i in range(self.args.guilds):
+            guild = FakeGuild(guild_id=GUILD_BASE + i, api=self.api)
+            role = guild.roles.setdefault(ROLE_BASE + i, FakeRole(role_id=ROLE_BASE + i, position=1))
+            bot_role = FakeRole(role_id=ROLE_BASE + 10 ** 6 + i, position=100)
+            guild.members[BOT_ID] = FakeMember(member_id=BOT_ID, guild=guild, roles=[bot_role])
+            self.admins[guild.id] = guild.members[ADMIN_ID] = FakeMember(member_id=ADMIN_ID, guild=guild)
+            channel = guild.channels.setdefault(CHANNEL_BASE + i, FakeChannel(channel_id=CHANNEL_BASE + i,
+                                                                              guild=guild))
+            self.bot.guilds[guild.id] = guild
+            self.codes[guild.id] = f"DROP-{i}"
+            self.spare[guild.id] = [f"SPARE-{i}-{n}" for n in range(removes)]
+            async with self.bot.pool.acquire() as db:
+                if self.args.log:
+                    if not await db.set_channel(guild_id=guild.id, channel_id=channel.id):
+                        await db.set_channel(guild_id=guild.id, channel_id=channel.id)
+                if not await db.code_exists(guild_id=guild.id, code=self.codes[guild.id]):
+                    await db.create_code(guild_id=guild.id, code=self.codes[guild.id], expire_in=None,
+                                         max_uses=self.args.max_uses, role_id=role.id,
+                                         role_expire_time=role_duration)
+                if self.spare[guild.id]:
+                    await db.create_codes(guild_id=guild.id, codes=self.spare[guild.id], expire_in=None,
+                                          max_uses=None, role_id=role.id, role_expire_time=None)
+        for cog in (Code, Create, Logging, Loop, Redeem, Remove):
+            self.cogs[cog.__name__] = cog(self.bot)
+
+    def record(self, command: str, interaction: FakeInteraction) -> None:
+        if command not in self.ack:
+            self.ack[command] = Recorder(name=f"{command}.ack")
+            self.total[command] = Recorder(name=f"{command}.total")
+            self.outcomes[command] = Counter()
+        self.total[command].add(perf_counter() - interaction.created)
+        if interaction.acked is None:
+            self.missed[command] += 1
+            self.outcomes[command]["never answered"] += 1
+            return
+        self.ack[command].add(interaction.acked - interaction.created)
+        if interaction.acked - interaction.created > DEADLINE:
+            self.missed[command] += 1
+        self.outcomes[command][interaction.outcome] += 1
+
+    async def interact(self, command: str, guild: FakeGuild, index: int, created: float) -> None:
+        if command == "redeem":
+            user = guild.members.setdefault(USER_BASE + index, FakeMember(member_id=USER_BASE + index, guild=guild))
+        else:
+            user = self.admins[guild.id]
+        interaction = FakeInteraction(client=self.bot, guild=guild, user=user, created=created)
+        try:
+            match command:
+                case "redeem":
+                    cog = self.cogs["Redeem"]
+                    await cog.slash.callback(cog, interaction, self.codes[guild.id])
+                case "code":
+                    cog = self.cogs["Code"]
+                    await cog.slash.callback(cog, interaction, self.codes[guild.id])
+                case "create":
+                    cog = self.cogs["Create"]
+                    await cog.slash.callback(cog, interaction, guild.get_role(ROLE_BASE + guild.id - GUILD_BASE),
+                                             f"NEW-{index}")
+                case "remove":
+                    cog = self.cogs["Remove"]
+                    code = self.spare[guild.id].pop() if self.spare[guild.id] else f"GONE-{index}"
+                    await cog.slash.callback(cog, interaction, code)
+                case "log":
+                    cog = self.cogs["Logging"]
+                    await cog.slash.callback(cog, interaction, guild.get_channel(CHANNEL_BASE + guild.id - GUILD_BASE))
+        except Exception as error:
+            self.errors[f"{command}: {type(error).__name__}"] += 1
+        self.record(command=command, interaction=interaction)
+        if interaction.modal is not None:
+            await self.submit(interaction=interaction)
+
+    async def submit(self, interaction: FakeInteraction) -> None:
+        """
+        Fills the /create modal in right away, the submission is a new interaction.
+        """
+        modal = interaction.modal
+        for item in (modal.expire_in, modal.role_expire_time, modal.max_uses):
+            item._value = ""
+        submission = FakeInteraction(client=self.bot, guild=interaction.guild, user=interaction.user)
+        try:
+            await modal.on_submit(submission)
+        except Exception as error:
+            self.errors[f"create_modal: {type(error).__name__}"] += 1
+        self.record(command="create_modal", interaction=submission)
+
+    async def drive(self, mix: list[tuple[str, int]]) -> float:
+        """
+        Replays the interactions at random times spread over the duration.
+
+        :return:`float` Seconds the replay took.
+        """
+        commands = [command for command, _ in mix]
+        weights = [weight for _, weight in mix]
+        guilds = list(self.bot.guilds.values())
+        arrivals = sorted(self.rng.uniform(0, self.args.duration) for _ in range(self.args.users))
+        tasks = []
+        started = perf_counter()
+        for index, arrival in enumerate(arrivals):
+            delay = started + arrival - perf_counter()
+            if delay > 0:
+                await sleep(delay)
+            command = self.rng.choices(commands, weights=weights)[0]
+            tasks.append(create_task(self.interact(command=command, guild=guilds[index % len(guilds)], index=index,
+                                                   created=started + arrival)))
+        await gather(*tasks)
+        return perf_counter() - started
+
+    async def drain(self) -> Recorder:
+        """
+        Waits for the expiry loop to remove every redeemed role.
+
+        :return:`Recorder` Seconds each role was removed after its due time.
+        """
+        lag = Recorder(name="expiry_lag")
+        duration = self.args.role_duration
+        if duration is None:
+            return lag
+        members = [member for guild in self.bot.guilds.values() for member in guild.members.values()
+                   if member.added and member.id not in (BOT_ID, ADMIN_ID)]
+        deadline = perf_counter() + duration + self.args.drain
+        while perf_counter() < deadline:
+            if all(len(member.removed) == len(member.added) for member in members):
+                break
+            await sleep(0.1)
+        for member in members:
+            for role_id, added in member.added.items():
+                if role_id in member.removed:
+                    lag.add(max(0.0, member.removed[role_id] - added - duration))
+        return lag
+
+
+def parse_mix(text: str) -> list[tuple[str, int]]:
+    mix: list[tuple[str, int]] = []
+    for part in text.split(","):
+        command, _, weight = part.partition("=")
+        if command not in ("redeem", "code", "create", "remove", "log"):
+            raise ValueError(f"unknown command {command}")
+        mix.append((command, int(weight or 1)))
+    return mix
+
+
+def parse_limit(text: str | None) -> tuple[int, float] | None:
+    if not text:
+        return None
+    requests, _, seconds = text.partition("/")
+    return int(requests), float(seconds or 1)
+
+
+def milliseconds(result: dict, key: str) -> str:
+    return f"{result[key]:.1f}" if key in result else "-"
+
+
+def print_report(results: dict) -> None:
+    print(f"{'command':<16}{'count':>8}{'p50 ack':>10}{'p99 ack':>10}{'max ack':>10}{'p99 total':>11}{'>3s':>7}")
+    for command, result in results["commands"].items():
+        ack, total = result["ack"], result["total"]
+        print(f"{command:<16}{total['count']:>8}{milliseconds(ack, 'p50_ms'):>10}{milliseconds(ack, 'p99_ms'):>10}"
+              f"{milliseconds(ack, 'max_ms'):>10}{milliseconds(total, 'p99_ms'):>11}{result['missed_deadline']:>7}")
+        for name, count in result["outcomes"].items():
+            print(f"    {count:>8}  {name}")
+    pool = results["pool"]
+    print(f"pool: wait p50 {milliseconds(pool['wait'], 'p50_ms')}ms p99 {milliseconds(pool['wait'], 'p99_ms')}ms, "
+          f"hold p99 {milliseconds(pool['hold'], 'p99_ms')}ms, {pool['locked']} locked errors")
+    print(f"api: {results['api']['calls']} calls, {results['api']['rate_limited']} rate limited")
+    if results["expiry_lag"].get("count"):
+        lag = results["expiry_lag"]
+        print(f"expiry: {lag['count']} roles removed, lag p50 {milliseconds(lag, 'p50_ms')}ms "
+              f"p99 {milliseconds(lag, 'p99_ms')}ms")
+    for name, count in results["errors"].items():
+        print(f"error: {count} x {name}")
+
+
+async def main(args, database: str) -> dict:
+    mix = parse_mix(text=args.mix)
+    buckets = {"member_roles": parse_limit(text=args.role_limit)} if args.role_limit else {}
+    api = FakeAPI(latency=args.latency / 1000, jitter=args.jitter / 1000, rate_limit=args.rate_limit,
+                  retry_after=args.retry_after, buckets=buckets, rng=Random(args.seed + 1))
+    logger = getLogger("discode.loadtest")
+    if args.storage == "memory":
+        pool = InstrumentedPool(pool=MemoryPool())
+    else:
+        pool = InstrumentedPool(pool=Pool(database=database, size=args.pool_size))
+    await pool.open()
+    dispatcher = Dispatcher(logger=logger)
+    bot = FakeBot(pool=pool, dispatcher=dispatcher, logger=logger, metrics=Metrics(), user_id=BOT_ID)
+    harness = Harness(args=args, bot=bot, api=api)
+    try:
+        removes = args.users * dict(mix).get("remove", 0) // sum(weight for _, weight in mix) + 1
+        await harness.setup(removes=removes // args.guilds + 1)
+        # Only the replay is measured.
+        pool.wait, pool.hold, pool.locked = Recorder(name="pool_wait"), Recorder(name="pool_hold"), 0
+        api.calls.clear()
+        api.limited.clear()
+        elapsed = await harness.drive(mix=mix)
+        lag = await harness.drain()
+    finally:
+        if "Loop" in harness.cogs:
+            task = harness.cogs["Loop"].task
+            task.cancel()
+            if task.get_task() is not None:
+                await gather(task.get_task(), return_exceptions=True)
+        await dispatcher.close()
+        await pool.close()
+    return {"seconds": round(elapsed, 3),
+            "commands": {command: {"ack": harness.ack[command].summary(),
+                                   "total": harness.total[command].summary(),
+                                   "missed_deadline": harness.missed[command],
+                                   "outcomes": dict(harness.outcomes[command])} for command in harness.ack},
+            "pool": {"wait": pool.wait.summary(), "hold": pool.hold.summary(), "locked": pool.locked},
+            "api": {"calls": dict(api.calls), "rate_limited": dict(api.limited)},
+            "expiry_lag": lag.summary(),
+            "errors": dict(harness.errors)}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Replays slash command interactions against the cogs with fake Discord "
+                                        "objects.")
+    parser.add_argument("--users", type=int, default=5000, help="interactions to replay")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds the interactions are spread over")
+    parser.add_argument("--mix", default="redeem", help="weighted commands, e.g. redeem=90,code=5,log=5")
+    parser.add_argument("--guilds", type=int, default=1)
+    parser.add_argument("--max-uses", type=int, default=None, help="uses of the shared code, unlimited by default")
+    parser.add_argument("--role-duration", type=int, default=None,
+                        help="seconds before redeemed roles expire, enables the expiry loop measurement")
+    parser.add_argument("--drain", type=float, default=30.0, help="seconds to wait for the expiry loop")
+    parser.add_argument("--no-log", dest="log", action="store_false", help="no log channels")
+    parser.add_argument("--latency", type=float, default=80.0, help="Discord API latency in ms")
+    parser.add_argument("--jitter", type=float, default=40.0, help="random ms added to the latency")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="chance of a 429 on any request")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds a random 429 asks to wait")
+    parser.add_argument("--role-limit", help="role edits allowed per guild, e.g. 10/10 for 10 per 10 seconds")
+    parser.add_argument("--storage", choices=("sqlite", "memory"), default="sqlite",
+                        help="storage engine, memory leaves out the cost of the database")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--source", help="seeded database to copy, see benchmarks.seed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file the results are written to")
+    args = parser.parse_args()
+    if args.source and args.storage == "memory":
+        parser.error("--source needs the sqlite storage.")
+
+    with TemporaryDirectory() as directory:
+        database = os.path.join(directory, "guilds.db")
+        if args.source:
+            copyfile(args.source, database)
+        results = run(main(args=args, database=database))
+    print_report(results=results)
+    if args.output:
+        write_results(path=args.output, parameters=vars(args), results=results)
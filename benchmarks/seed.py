@@ -0,0 +1,155 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# Usage:
+#   python -m benchmarks.seed bench.db --guilds 1000 --codes 1000000 --redemptions 5000000
+
+from core.models import Pool
+from argparse import ArgumentParser
+from array import array
+from asyncio import run
+from datetime import datetime, timedelta
+from itertools import islice
+from random import Random
+from string import ascii_uppercase, digits
+from time import perf_counter
+import sqlite3
+import os
+
+# Ids in the range of real Discord snowflakes.
+GUILD_BASE: int = 900_000_000_000_000_000
+CHANNEL_BASE: int = 910_000_000_000_000_000
+ROLE_BASE: int = 920_000_000_000_000_000
+USER_BASE: int = 930_000_000_000_000_000
+# Role durations of the seeded codes, None being a lifetime role.
+DURATIONS: tuple[int | None, ...] = (None, 3600, 86400, 604800)
+ALPHABET: str = ascii_uppercase + digits
+
+
+def timestamp(value: datetime) -> int:
+    # Stored as epoch seconds.
+    return int(value.timestamp())
+
+
+def insert(connection: sqlite3.Connection, sql: str, rows, chunk: int = 50_000) -> None:
+    rows = iter(rows)
+    while batch := list(islice(rows, chunk)):
+        connection.executemany(sql, batch)
+
+
+async def create_schema(database: str) -> int:
+    pool = Pool(database=database, size=1)
+    await pool.open()
+    try:
+        return pool.version
+    finally:
+        await pool.close()
+
+
+def seed(database: str, guilds: int, codes: int, redemptions: int, expired: float = 0.01,
+         users: int = 1_000_000, seed_value: int = 0) -> dict:
+    """
+    Fills a new database with synthetic guilds, codes and redemptions.
+
+    The same arguments always produce the same rows, only the created_at
+    columns and the timestamps relative to now differ between runs.
+
+    :param expired:`float` Share of the redemptions whose role is already due.
+    :param users:`int` Number of distinct users redeeming.
+    :return:`dict` The parameters, stored next to the benchmark results.
+    """
+    if guilds < 1 or codes < 1:
+        raise ValueError("guilds and codes must be positive.")
+    version = run(create_schema(database=database))
+    rng = Random(seed_value)
+    now = datetime.now().replace(microsecond=0)
+    connection = sqlite3.connect(database)
+    try:
+        # Throwaway file, durability does not matter while seeding.
+        connection.execute("""PRAGMA synchronous = OFF;""")
+        connection.execute("""PRAGMA journal_mode = MEMORY;""")
+        connection.execute("""BEGIN;""")
+        insert(connection, """INSERT INTO guilds(id, channel) VALUES(?, ?);""",
+               ((GUILD_BASE + i, CHANNEL_BASE + i) for i in range(guilds)))
+        durations = [rng.choice(DURATIONS) for _ in range(codes)]
+
+        def code_rows():
+            for i in range(codes):
+                text = "".join(rng.choices(ALPHABET, k=20))
+                code = "-".join((text[0:4], text[4:8], text[8:12], text[12:16], text[16:20]))
+                expires_at = timestamp(now + timedelta(days=30)) if rng.random() < 0.1 else None
+                yield i + 1, code, expires_at, GUILD_BASE + i % guilds, ROLE_BASE + i % 50, durations[i]
+
+        insert(connection, """INSERT INTO codes(id, code, expires_at, max_uses, guild_id, role_id, role_expire_time)
+                              VALUES(?, ?, ?, NULL, ?, ?, ?);""", code_rows())
+        uses = array("I", bytes(4 * codes))
+
+        def redemption_rows():
+            for _ in range(redemptions):
+                code_id = rng.randrange(codes) + 1
+                uses[code_id - 1] += 1
+                duration = durations[code_id - 1]
+                if rng.random() < expired:
+                    expires_at = timestamp(now - timedelta(seconds=rng.randrange(1, 86400)))
+                elif duration is not None:
+                    expires_at = timestamp(now + timedelta(seconds=rng.randrange(1, duration + 1)))
+                else:
+                    expires_at = None
+                yield USER_BASE + rng.randrange(users), ROLE_BASE + (code_id - 1) % 50, code_id, expires_at
+
+        insert(connection, """INSERT INTO redemption(user_id, role_id, code_id, expires_at)
+                              VALUES(?, ?, ?, ?);""", redemption_rows())
+        insert(connection, """UPDATE codes SET uses_count = ? WHERE id = ?;""",
+               ((count, i + 1) for i, count in enumerate(uses) if count))
+        connection.commit()
+        connection.execute("""ANALYZE;""")
+    finally:
+        connection.close()
+    return {"guilds": guilds, "codes": codes, "redemptions": redemptions, "expired": expired,
+            "users": users, "seed": seed_value, "schema_version": version}
+
+
+def add_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--codes", type=int, default=100_000)
+    parser.add_argument("--redemptions", type=int, default=500_000)
+    parser.add_argument("--expired", type=float, default=0.01, help="share of redemptions already due")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Creates a synthetic guilds.db for the benchmarks.")
+    parser.add_argument("database")
+    parser.add_argument("--force", action="store_true", help="replace an existing file")
+    add_arguments(parser=parser)
+    args = parser.parse_args()
+    if os.path.exists(args.database):
+        if not args.force:
+            parser.error(f"{args.database} exists, pass --force to replace it.")
+        os.remove(args.database)
+    started = perf_counter()
+    seed(database=args.database, guilds=args.guilds, codes=args.codes, redemptions=args.redemptions,
+         expired=args.expired, users=args.users, seed_value=args.seed)
+    print(f"Seeded {args.database} in {perf_counter() - started:.1f}s.")
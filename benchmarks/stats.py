@@ -0,0 +1,107 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from platform import python_version, platform
+from statistics import mean, quantiles
+from subprocess import run, DEVNULL
+from datetime import datetime
+from sqlite3 import sqlite_version
+from time import perf_counter
+from json import dump
+
+
+class Recorder(object):
+    __slots__ = ('name', 'latencies', 'started', 'elapsed')
+
+    def __init__(self, name: str):
+        """
+        Latencies of one benchmarked operation.
+
+        :param name:`str` Name the results are stored under.
+        """
+        self.name = name
+        self.latencies: list[float] = []
+        self.started: float = 0.0
+        self.elapsed: float = 0.0
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.elapsed += perf_counter() - self.started
+
+    def add(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def summary(self) -> dict:
+        """
+        :return:`dict` Count, throughput and latency percentiles in milliseconds.
+        """
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"count": 0}
+        cuts = quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else [latencies[0]] * 99
+        elapsed = self.elapsed or sum(latencies)
+        return {"count": len(latencies),
+                "seconds": round(elapsed, 4),
+                "ops_per_second": round(len(latencies) / elapsed, 2) if elapsed else None,
+                "mean_ms": round(mean(latencies) * 1000, 4),
+                "p50_ms": round(cuts[49] * 1000, 4),
+                "p99_ms": round(cuts[98] * 1000, 4),
+                "max_ms": round(latencies[-1] * 1000, 4)}
+
+
+def environment() -> dict:
+    """
+    Describes where the results come from so runs can be compared.
+
+    :return:`dict`
+    """
+    try:
+        commit = run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                     stdin=DEVNULL).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit,
+            "date": datetime.now().replace(microsecond=0).isoformat(),
+            "python": python_version(),
+            "sqlite": sqlite_version,
+            "platform": platform()}
+
+
+def write_results(path: str, parameters: dict, results: dict) -> None:
+    with open(path, "w", encoding="utf-8") as fp:
+        dump({"environment": environment(), "parameters": parameters, "results": results}, fp, indent=2)
+        fp.write("\n")
+
+
+def print_results(results: dict) -> None:
+    print(f"{'operation':<24}{'count':>9}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, result in results.items():
+        if not result.get("count"):
+            print(f"{name:<24}{0:>9}")
+            continue
+        print(f"{name:<24}{result['count']:>9}{result['ops_per_second']:>12}{result['p50_ms']:>10}"
+              f"{result['p99_ms']:>10}{result['max_ms']:>10}")
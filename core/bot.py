@@ -23,12 +23,17 @@ DEALINGS IN THE SOFTWARE.
 """
 
 # ------ Core ------
-from .models import logger
+from .models import logger, Pool, MemoryPool, Dispatcher, Metrics, RequestCounter
 
 # ------ Discord ------
 import discord
+from discord import app_commands, Interaction
 from discord.ext import commands
 from discord.errors import LoginFailure, DiscordException
+from logging import getLogger
+from time import perf_counter
+import asyncio
+import signal
 
 # ------ Environment ------
 from dotenv import load_dotenv
@@ -36,13 +41,30 @@ from pathlib import Path
 import os
 
 
+class Tree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: Interaction, /) -> bool:
+        # Start of the command latency.
+        interaction.extras["started"] = perf_counter()
+        return True
+
+    async def on_error(self, interaction: Interaction, error: app_commands.AppCommandError, /) -> None:
+        self.client.observe(interaction=interaction, outcome="error")
+        await super().on_error(interaction, error)
+
+
 class Bot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.members = True
-        super().__init__(intents=intents, command_prefix=None)
+        super().__init__(intents=intents, command_prefix=None, tree_cls=Tree)
         # logging event.
         self.logger = logger()
+        # latency and health, served to Prometheus.
+        self.metrics = Metrics()
+        # storage engine, replaced by the configured one in setup_hook.
+        self.pool: Pool | MemoryPool = Pool(metrics=self.metrics)
+        # log channel events, sent in the background.
+        self.dispatcher = Dispatcher(logger=self.logger)
 
     async def on_connect(self) -> None:
         self.logger.info(f"Connected as {self.user} with ID {self.user.id}")
@@ -51,15 +73,65 @@ class Bot(commands.Bot):
         """
         This function called when the bot is ready.
         """
+        await self.pool.warm_up()
+        self.logger.info(msg=f"Loaded the settings of {len(self.pool.guilds):,} guilds.")
         self.logger.info(msg=f"Bot is now ready with latency of {self.latency * 1000:,.0f}ms")
         self.logger.info(msg=f"Invitation link:"
                              f" https://discord.com/api/oauth2/authorize?client_id={self.application_id}"
                              f"&permissions=8&scope=bot%20applications.commands")
 
+    async def on_app_command_completion(self, interaction: Interaction, command: app_commands.Command) -> None:
+        self.observe(interaction=interaction, outcome=interaction.extras.get("outcome", "success"))
+
+    def observe(self, interaction: Interaction, outcome: str) -> None:
+        """
+        Records the latency and the outcome of a slash command.
+        """
+        command = interaction.command.qualified_name if interaction.command is not None else "unknown"
+        self.metrics.outcomes.inc(command=command, outcome=outcome)
+        if "started" in interaction.extras:
+            self.metrics.commands.observe(perf_counter() - interaction.extras["started"], command=command)
+
     async def setup_hook(self) -> None:
+        # ---------------------------
+        # Opening the storage engine.
+        storage = os.getenv("STORAGE", "sqlite").lower()
+        if storage == "memory":
+            # Nothing is kept once the bot stops.
+            self.pool = MemoryPool(metrics=self.metrics)
+        else:
+            # reads run on their own connections, writes of concurrent commands are committed together.
+            self.pool = Pool(database=os.getenv("DATABASE", "guilds.db"),
+                             size=int(os.getenv("DB_READERS", 4)),
+                             metrics=self.metrics,
+                             batch=int(os.getenv("WRITE_BATCH", 100)),
+                             window=float(os.getenv("WRITE_WINDOW_MS", 2)) / 1000,
+                             wal=os.getenv("DB_WAL", "1").lower() in ("1", "true", "yes"))
+        await self.pool.open()
+        engine = "memory" if isinstance(self.pool, MemoryPool) else "sqlite"
+        self.logger.info(msg=f"Storage engine is {engine}, schema at version {self.pool.version}.")
+        # --------------------------------
+        # Slow statement log and its report.
+        self.pool.profiler.logger = self.logger
+        self.pool.profiler.threshold = float(os.getenv("SLOW_QUERY_MS", 100)) / 1000
+        self.pool.profiler.explain = os.getenv("SLOW_QUERY_EXPLAIN", "0").lower() in ("1", "true", "yes")
+        if hasattr(signal, "SIGUSR1"):
+            try:
+                asyncio.get_running_loop().add_signal_handler(
+                    signal.SIGUSR1, lambda: self.logger.info(f"[DB] Statements:\n{self.pool.profiler.report(top=20)}"))
+            except (NotImplementedError, RuntimeError):
+                pass
+        # -------------------------------------------
+        # Counting Discord API calls and rate limits.
+        getLogger("discord.http").addHandler(RequestCounter(metrics=self.metrics))
+        port = os.getenv("METRICS_PORT")
+        if port:
+            host = os.getenv("METRICS_HOST", "127.0.0.1")
+            await self.metrics.serve(host=host, port=int(port))
+            self.logger.info(msg=f"Serving metrics on http://{host}:{port}/metrics")
         # ------------------
         # Loading extensions.
-        for extension in ["code", "create", "remove", "redeem", "logging", "loop"]:
+        for extension in ["code", "create", "remove", "redeem", "logging", "loop", "transfer", "queries"]:
             try:
                 await self.load_extension(name=f'core.cogs.{extension}')
             except DiscordException:
@@ -69,6 +141,20 @@ class Bot(commands.Bot):
         # syncing globally may take an hour.
         await self.tree.sync()
 
+    async def close(self) -> None:
+        await self.metrics.close()
+        # ---------------------------------------------------------
+        # Unloading the cogs first so nothing is dispatched anymore,
+        # the queued log embeds are sent while the client is still open.
+        for extension in tuple(self.extensions):
+            try:
+                await self.unload_extension(name=extension)
+            except DiscordException:
+                self.logger.error(msg=f"Unable to unload `{extension}` extension.")
+        await self.dispatcher.close()
+        await super().close()
+        await self.pool.close()
+
     async def run_bot(self) -> None:
         async with self:
             try:
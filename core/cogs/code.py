@@ -24,13 +24,14 @@ DEALINGS IN THE SOFTWARE.
 
 # ------ Core ------
 from ..bot import Bot
-from ..models import Database, Errors
+from ..models import Errors, Code as CodeRecord
 from ..utils import embed_wrong, period
 # ------ Discord ------
 from discord import Interaction, app_commands, Embed
 from discord.ext.commands import Cog
 # ------ Datetime ------
-from datetime import datetime, timedelta
+from datetime import timedelta
+from time import time
 
 
 class Code(Cog):
@@ -45,31 +46,32 @@ class Code(Cog):
     @app_commands.command(name="code", description="Get information about code")
     @app_commands.default_permissions(administrator=True)
     async def slash(self, interaction: Interaction, code: str) -> None:
-        async with Database() as db:
-            try:
-                get_code: dict = await db.get_code(guild_id=interaction.guild_id, code=code)
-                # Code expire time.
-                time = datetime.now() if get_code['expires_at'] is None else get_code['expires_at']
-                timestamp = f"<t:{int(datetime.timestamp(time))}:R>"
-                # Role duration
-                if get_code['role']['expire_time'] is not None:
-                    duration = period(timedelta(seconds=get_code['role']['expire_time']))
-                else:
-                    duration = "`lifetime`"
-                max_uses = get_code['max_uses'] if get_code['max_uses'] is not None else '∞'
-                description = \
-                    f"> ||{code}||\n\n" \
-                    f"Expire: {timestamp if get_code['expires_at'] is not None else '`lifetime`'}\n " \
-                    f"Uses: `[{get_code['uses_count']}/{max_uses}]`\n " \
-                    f"Role: <@&{get_code['role']['id']}>\n " \
-                    f"Duration: `{duration}`"
+        try:
+            # The connection is handed back before any Discord call.
+            async with self.bot.pool.acquire() as db:
+                get_code: CodeRecord = await db.get_code(guild_id=interaction.guild_id, code=code)
+            # Code expire time.
+            timestamp = f"<t:{int(time()) if get_code.expires_at is None else get_code.expires_at}:R>"
+            # Role duration
+            if get_code.role_expire_time is not None:
+                duration = period(timedelta(seconds=get_code.role_expire_time))
+            else:
+                duration = "`lifetime`"
+            max_uses = get_code.max_uses if get_code.max_uses is not None else '∞'
+            description = \
+                f"> ||{code}||\n\n" \
+                f"Expire: {timestamp if get_code.expires_at is not None else '`lifetime`'}\n " \
+                f"Uses: `[{get_code.uses_count}/{max_uses}]`\n " \
+                f"Role: <@&{get_code.role_id}>\n " \
+                f"Duration: `{duration}`"
 
-                embed = Embed(title="Code information", description=description, colour=0x738adb)
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+            embed = Embed(title="Code information", description=description, colour=0x738adb)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            except Errors.CodeNotFound:
-                embed = embed_wrong(msg=f"Code is not found")
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Errors.CodeNotFound:
+            interaction.extras["outcome"] = "CodeNotFound"
+            embed = embed_wrong(msg=f"Code is not found")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
 async def setup(bot) -> None: await bot.add_cog(Code(bot))
@@ -24,13 +24,19 @@ DEALINGS IN THE SOFTWARE.
 
 # ------ Core ------
 from ..bot import Bot
-from ..models import Database, Errors
+from ..models import Errors, CodeGenerator, Guild
 from ..utils import embed_wrong, period, text_to_seconds, generate_code
 # ------ Discord ------
-from discord import Interaction, app_commands, ui, Role, Embed
+from discord import Interaction, app_commands, ui, Role, Embed, File
 from discord.ext.commands import Cog
 # ------ Datetime ------
-from datetime import datetime, timedelta
+from datetime import timedelta
+from time import time
+# ------ Export ------
+from io import BytesIO
+
+# Rounds of /create-bulk regenerating the codes that clashed.
+BULK_ROUNDS: int = 8
 
 
 class Create(Cog):
@@ -48,25 +54,108 @@ class Create(Cog):
         bot_role = interaction.guild.get_member(self.bot.user.id).top_role
         # Checks if the bot top role higher than the role that will give.
         if bot_role > role:
-            async with Database() as db:
-                try:
-                    if code is None:
-                        while True:
-                            # Generating a random code.
-                            code = generate_code(n=4)
-                            # Checks if the code exist.
-                            await db.get_code(code=code, guild_id=interaction.guild_id)
-                    else:
-                        await db.get_code(code=code, guild_id=interaction.guild_id)
-                    embed = embed_wrong(msg=f"Code is already exists")
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                except Errors.CodeNotFound:
-                    modal = MyModal(code=code, role=role)
-                    await interaction.response.send_modal(modal)
+            async with self.bot.pool.acquire() as db:
+                exists = False
+                if code is None:
+                    # Generating a random code until a free one is found,
+                    # the filter answers most checks without the database.
+                    code = generate_code(n=4)
+                    while await db.code_exists(code=code, guild_id=interaction.guild_id):
+                        code = generate_code(n=4)
+                else:
+                    exists = await db.code_exists(code=code, guild_id=interaction.guild_id)
+            if exists:
+                interaction.extras["outcome"] = "CodeIsAlreadyExists"
+                embed = embed_wrong(msg=f"Code is already exists")
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+            else:
+                modal = MyModal(code=code, role=role)
+                await interaction.response.send_modal(modal)
         else:
             embed = embed_wrong(msg=f"{bot_role.mention} Role have to be Higher then {role.mention}.")
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @app_commands.command(name="create-bulk", description="Create many codes at once.")
+    @app_commands.describe(count="Number of codes",
+                           expire_in="Code expire in, leave it empty for lifetime use",
+                           max_uses="Max uses of each code, leave it empty for unlimited uses",
+                           role_duration="Role expire time, leave it empty for lifetime role")
+    @app_commands.default_permissions(administrator=True)
+    async def bulk(self, interaction: Interaction, role: Role, count: app_commands.Range[int, 1, 100_000],
+                   expire_in: str = None, max_uses: int = None, role_duration: str = None) -> None:
+        bot_role = interaction.guild.get_member(self.bot.user.id).top_role
+        # Checks if the bot top role higher than the role that will give.
+        if not bot_role > role:
+            embed = embed_wrong(msg=f"{bot_role.mention} Role have to be Higher then {role.mention}.")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        try:
+            expire_at = None
+            role_expire_time = None
+            # Code expire time.
+            if expire_in is not None:
+                expire_at = int(time()) + text_to_seconds(text=expire_in)
+            # Role expire time
+            if role_duration is not None:
+                role_expire_time = text_to_seconds(text=role_duration)
+            # Max code uses.
+            if max_uses is not None:
+                max_uses = abs(max_uses)
+        except ValueError:
+            embed = embed_wrong(msg=f"Invalid values.")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        wrong: str | None = None
+        async with self.bot.pool.acquire() as db:
+            # ---------------------------------------------------------
+            # Generating the codes in memory, only clashes with existing
+            # codes are generated again.
+            generator = CodeGenerator(groups=4)
+            existing = await db.count_codes(guild_id=interaction.guild_id)
+            collision = generator.collision_probability(existing=existing, count=count)
+            codes: set[str] = set()
+            # Never asking for more codes than are left, and giving up after a few rounds of clashes.
+            if count <= generator.space - existing:
+                for _ in range(BULK_ROUNDS):
+                    batch = set(generator.generate(count=count - len(codes))) - codes
+                    codes |= batch - await db.existing_codes(guild_id=interaction.guild_id, codes=batch)
+                    if len(codes) == count:
+                        break
+            codes: list[str] = sorted(codes)
+            if len(codes) < count:
+                wrong = f"Unable to generate `{count}` free codes."
+            else:
+                try:
+                    guild = await db.create_codes(guild_id=interaction.guild_id,
+                                                  codes=codes,
+                                                  expire_in=expire_at,
+                                                  max_uses=max_uses,
+                                                  role_id=role.id,
+                                                  role_expire_time=role_expire_time)
+                except Errors.CodeIsAlreadyExists as error:
+                    # Another command took one of the codes meanwhile, nothing was created.
+                    interaction.extras["outcome"] = "CodeIsAlreadyExists"
+                    wrong = f"Code `{error.code}` was created meanwhile, please try again."
+        if wrong is not None:
+            await interaction.followup.send(embed=embed_wrong(msg=wrong), ephemeral=True)
+            return
+        timestamp = f"<t:{int(time()) if expire_at is None else expire_at}:R>"
+        duration = period(timedelta(seconds=role_expire_time)) if role_expire_time is not None else "lifetime"
+        description = \
+            f"> `{count}` codes\n\n" \
+            f"Expire: {timestamp if expire_at is not None else '`lifetime`'}\n " \
+            f"Max Uses: `{max_uses if max_uses is not None else 'unlimited'}`\n " \
+            f"Role:{role.mention}\n " \
+            f"Duration: `{duration}`"
+        embed = Embed(title="Codes as been created!", description=description, colour=0x738adb)
+        embed.set_footer(text=f"Collision chance {collision:.2e}")
+        file = File(fp=BytesIO("\n".join(codes).encode()), filename=f"codes-{role.id}.txt")
+        await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+        # Logging
+        MyModal.logger(interaction=interaction, guild=guild, description=description,
+                       title=f"Created {count} codes")
+
 
 class MyModal(ui.Modal):
     __slots__ = ("code", "role_id", "expire_in", "role_expire_time", "max_uses")
@@ -98,15 +187,14 @@ class MyModal(ui.Modal):
             max_uses = None
             # Code expire time.
             if str(self.expire_in.value) != "":
-                expire_in = datetime.now().replace(microsecond=0) \
-                            + timedelta(seconds=text_to_seconds(text=str(self.expire_in.value)))
+                expire_in = int(time()) + text_to_seconds(text=str(self.expire_in.value))
             # Role expire time
             if str(self.role_expire_time.value) != "":
                 role_expire_time = text_to_seconds(text=str(self.role_expire_time.value))
             # Max code uses.
             if str(self.max_uses.value) != "":
                 max_uses = abs(int(self.max_uses.value))
-            async with Database() as db:
+            async with interaction.client.pool.acquire() as db:
                 try:
                     # -----------------
                     # Creating the code.
@@ -116,7 +204,7 @@ class MyModal(ui.Modal):
                                                  max_uses=max_uses,
                                                  role_id=self.role.id,
                                                  role_expire_time=role_expire_time)
-                    timestamp = f"<t:{int(datetime.timestamp(datetime.now() if expire_in is None else expire_in))}:R>"
+                    timestamp = f"<t:{int(time()) if expire_in is None else expire_in}:R>"
                     duration = period(timedelta(seconds=role_expire_time)) if \
                         role_expire_time is not None else "lifetime"
                     description = \
@@ -128,7 +216,7 @@ class MyModal(ui.Modal):
                     embed = Embed(title="Code as been created!", description=description, colour=0x738adb)
                     await interaction.response.send_message(embed=embed, ephemeral=True)
                     # Logging
-                    await self.logger(interaction=interaction, guild=guild, description=description)
+                    self.logger(interaction=interaction, guild=guild, description=description)
                 except Errors.CodeIsAlreadyExists:
                     embed = embed_wrong(msg=f"Code is already exists")
                     await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -137,17 +225,17 @@ class MyModal(ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @staticmethod
-    async def logger(interaction: Interaction, guild: dict, description: str) -> None:
-        if guild["channel_id"] is not None:
-            channel = interaction.guild.get_channel(guild["channel_id"])
+    def logger(interaction: Interaction, guild: Guild, description: str, title: str = "Created a code") -> None:
+        if guild.channel_id is not None:
+            channel = interaction.guild.get_channel(guild.channel_id)
             if channel is not None:
-                embed = Embed(title="Created a code", description=description, colour=0x1f8b4c)
+                embed = Embed(title=title, description=description, colour=0x1f8b4c)
                 if interaction.user.avatar is None:
                     embed.set_author(name=interaction.user)
                 else:
                     embed.set_author(name=interaction.user,
                                      icon_url=interaction.user.avatar.url)
-                await channel.send(embed=embed)
+                interaction.client.dispatcher.dispatch(channel=channel, embed=embed)
 
 
 async def setup(bot) -> None: await bot.add_cog(Create(bot))
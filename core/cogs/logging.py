@@ -24,7 +24,6 @@ DEALINGS IN THE SOFTWARE.
 
 # ------ Core ------
 from ..bot import Bot
-from ..models import Database
 # ------ Discord ------
 from discord import Interaction, app_commands, Embed, TextChannel
 from discord.ext.commands import Cog
@@ -43,7 +42,7 @@ class Logging(Cog):
     @app_commands.describe(channel="Logging Channel")
     @app_commands.default_permissions(administrator=True)
     async def slash(self, interaction: Interaction, channel: TextChannel) -> None:
-        async with Database() as db:
+        async with self.bot.pool.acquire() as db:
             set_channel = await db.set_channel(guild_id=interaction.guild_id, channel_id=channel.id)
             if set_channel:
 
@@ -24,62 +24,154 @@ DEALINGS IN THE SOFTWARE.
 
 # ------ Core ------
 from ..bot import Bot
-from ..models import Database
+from ..models import Executor
 # ------ Discord ------
-from discord import TextChannel, Embed, Member, Role
+from discord import TextChannel, Embed, Member, Role, HTTPException
 from discord.ext.commands import Cog
 from discord.ext import tasks
+# ------ Datetime ------
+from asyncio import FIRST_COMPLETED, Task, create_task, gather, sleep, wait
+from time import perf_counter, time
+# ------ Environment ------
+import os
 
 
 class Loop(Cog):
-    __slots__ = "bot"
+    __slots__ = ("bot", "executor", "read_ahead")
 
     def __init__(self, bot: Bot) -> None:
         """
-        Checks for expired roles
+        Removes expired roles when their deadline is due
         """
         self.bot = bot
+        self.executor = Executor(concurrency=int(os.getenv("EXPIRY_CONCURRENCY", 16)),
+                                 guild_concurrency=int(os.getenv("EXPIRY_GUILD_CONCURRENCY", 1)))
+        # Pages being handled at once, a busy guild only holds back its own roles until they are all read.
+        self.read_ahead = int(os.getenv("EXPIRY_READ_AHEAD", 8))
         self.task.start()
 
-    @tasks.loop(seconds=30)
+    async def cog_unload(self) -> None:
+        self.task.cancel()
+
+    @tasks.loop()
     async def task(self):
         await self.bot.wait_until_ready()
+        scheduler = self.bot.pool.scheduler
+        metrics = self.bot.metrics
         removes: int = 0
         fails: int = 0
-        guild = None
-        channel = None
 
         try:
-            async with Database() as db:
-                async for user in db.expired_roles():
-                    if user["guild_id"] != guild:
-                        guild = self.bot.get_guild(user["guild_id"])
-                        if (guild is not None) and (user["channel_id"] is not None):
-                            channel = guild.get_channel(user["channel_id"])
-                    if guild is not None:
-                        role = guild.get_role(user["role_id"])
-                        member = guild.get_member(user["user_id"])
-                        if (role is not None) and (member is not None):
-                            # Checks if the bot top role higher than the role that will give.
-                            if guild.get_member(self.bot.user.id).top_role > role:
-                                await member.remove_roles(role)
-                                removes += 1
-                                await self.logger(channel=channel, member=member, role=role)
-                            else:
-                                fails += 1
-                        else:
-                            fails += 1
-                    else:
-                        fails += 1
-
+            # -------------------------------------------------
+            # Reloading deadlines after a restart or a trimmed heap.
+            if scheduler.stale:
+                async with self.bot.pool.acquire() as db:
+                    scheduler.load(deadlines=await db.next_expiries(limit=scheduler.limit))
+            await scheduler.wait()
+            if scheduler.next is None:
+                return
+            started = perf_counter()
+            now = int(time())
+            metrics.lag.set(max(0, now - scheduler.next))
+            # --------------------------------------------------------------
+            # Pages are read ahead while the earlier ones are still handled,
+            # the jobs of every guild keep flowing across pages. A connection
+            # is only borrowed to read a page, never during the removals.
+            pages: set[Task] = set()
+            try:
+                async with self.bot.pool.acquire() as db:
+                    metrics.backlog.set(await db.count_expired(now=now))
+                    async for page in db.expired_roles(now=now):
+                        pages.add(create_task(self.handle(page=page)))
+                        if len(pages) >= self.read_ahead:
+                            done, pages = await wait(pages, return_when=FIRST_COMPLETED)
+                            for result in done:
+                                removes += result.result()[0]
+                                fails += result.result()[1]
+                for result in await gather(*pages):
+                    removes += result[0]
+                    fails += result[1]
+            except BaseException:
+                for page in pages:
+                    page.cancel()
+                raise
+
+            scheduler.pop_due(now=now)
+            metrics.loop_duration.observe(perf_counter() - started)
+            metrics.loop_roles.inc(removes, result="removed")
+            metrics.loop_roles.inc(fails, result="failed")
             if fails + removes != 0:
                 self.bot.logger.info(f"[LOOP] {removes} roles has been removed with {fails} fails.")
 
         except Exception as error:
             self.bot.logger.error(error)
+            # Retrying from the database later instead of spinning on the same deadline.
+            scheduler.stale = True
+            await sleep(30)
+
+    async def handle(self, page: list) -> tuple[int, int]:
+        """
+        Removes the roles of one page, then deletes it once every job is done.
+
+        A crash before the delete replays the page.
 
-    @staticmethod
-    async def logger(channel: TextChannel | None, member: Member, role: Role) -> None:
+        :return:`tuple[int, int]` Number of removed and failed roles.
+        """
+        # One job per member so stacked roles go in a single edit,
+        # redemptions whose code is gone have no guild and are only deleted.
+        jobs: dict[tuple[int, int], dict] = {}
+        for user in page:
+            if user.guild_id is None:
+                continue
+            job = jobs.setdefault((user.guild_id, user.user_id), {"guild_id": user.guild_id,
+                                                                  "channel_id": user.channel_id,
+                                                                  "user_id": user.user_id,
+                                                                  "role_ids": []})
+            job["role_ids"].append(user.role_id)
+        # A member whose edit raised failed every role of the job.
+        results = await gather(*[self.executor.start(guild_id=job["guild_id"], job=job, worker=self.remove,
+                                                     failures=lambda item: len(item["role_ids"]))
+                                 for job in jobs.values()])
+        async with self.bot.pool.acquire() as db:
+            await db.delete_redemptions(rowids=[user.rowid for user in page])
+        return sum(result[0] for result in results), sum(result[1] for result in results)
+
+    async def remove(self, job: dict) -> tuple[int, int]:
+        """
+        Removes every expired role of one member with a single edit.
+
+        :return:`tuple[int, int]` Number of removed and failed roles.
+        """
+        count: int = len(job["role_ids"])
+        guild = self.bot.get_guild(job["guild_id"])
+        if guild is None:
+            return 0, count
+        member = guild.get_member(job["user_id"])
+        if member is None:
+            return 0, count
+        bot_role = guild.get_member(self.bot.user.id).top_role
+        roles: list[Role] = []
+        for role_id in dict.fromkeys(job["role_ids"]):
+            role = guild.get_role(role_id)
+            # Checks if the bot top role higher than the role that will give.
+            if (role is not None) and (bot_role > role):
+                roles.append(role)
+        if not roles:
+            return 0, count
+        try:
+            # atomic=False sends one member edit instead of one request per role.
+            await member.remove_roles(*roles, atomic=False)
+        except HTTPException as error:
+            self.bot.logger.error(f"[LOOP] Unable to remove roles from {member.id}: {error}")
+            return 0, count
+        channel = guild.get_channel(job["channel_id"]) if job["channel_id"] is not None else None
+        for role in roles:
+            self.logger(channel=channel, member=member, role=role)
+        # Stacked codes may expire the same role twice, both count as removed.
+        removed: int = sum(1 for role_id in job["role_ids"] if any(role.id == role_id for role in roles))
+        return removed, count - removed
+
+    def logger(self, channel: TextChannel | None, member: Member, role: Role) -> None:
         if channel is not None:
             embed = Embed(description=f"{role.mention} has been removed.", colour=0x71368a)
             if member.avatar is None:
@@ -87,7 +179,7 @@ class Loop(Cog):
             else:
                 embed.set_author(name=member,
                                  icon_url=member.avatar.url)
-            await channel.send(embed=embed)
+            self.bot.dispatcher.dispatch(channel=channel, embed=embed)
 
 
 async def setup(bot) -> None: await bot.add_cog(Loop(bot))
@@ -0,0 +1,66 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# ------ Core ------
+from ..bot import Bot
+from ..utils import embed_wrong
+# ------ Discord ------
+from discord import Interaction, app_commands, Embed, File
+from discord.ext.commands import Cog
+# ------ Report ------
+from io import BytesIO
+from typing import Literal
+
+
+class Queries(Cog):
+    __slots__ = "bot"
+
+    def __init__(self, bot: Bot) -> None:
+        """
+        Database statements report slash command
+        """
+        self.bot = bot
+
+    @app_commands.command(name="queries", description="Show the database statements that take the most time.")
+    @app_commands.describe(top="Number of statements", sort="Order of the statements", reset="Start counting again")
+    @app_commands.default_permissions(administrator=True)
+    async def slash(self, interaction: Interaction, top: app_commands.Range[int, 1, 50] = 10,
+                    sort: Literal["total", "avg", "max", "count", "rows"] = "total", reset: bool = False) -> None:
+        # The report covers every guild, only the bot owner may read it.
+        if not await self.bot.is_owner(interaction.user):
+            embed = embed_wrong(msg=f"Only the bot owner can use this command.")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        profiler = self.bot.pool.profiler
+        report = profiler.report(top=top, sort=sort)
+        if reset:
+            profiler.reset()
+        embed = Embed(title="Database statements",
+                      description=f"Slow statements are logged after `{profiler.threshold * 1000:.0f}ms`.",
+                      colour=0x738adb)
+        file = File(fp=BytesIO(report.encode()), filename="queries.txt")
+        await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
+
+
+async def setup(bot) -> None: await bot.add_cog(Queries(bot))
@@ -24,7 +24,7 @@ DEALINGS IN THE SOFTWARE.
 
 # ------ Core ------
 from ..bot import Bot
-from ..models import Database, Errors
+from ..models import Errors, Claim
 from ..utils import embed_wrong, period
 # ------ Discord ------
 from discord import Interaction, app_commands, Embed
@@ -44,60 +44,64 @@ class Redeem(Cog):
 
     @app_commands.command(name="redeem", description="Redeem a code that gives you a role.")
     async def slash(self, interaction: Interaction, code: str) -> None:
-        async with Database() as db:
-            try:
-                guild: dict = await db.redeem(guild_id=interaction.guild_id, code=code, user_id=interaction.user.id)
-                role = interaction.guild.get_role(guild["role"]["id"])
-                # Role time format
-                if guild["role"]["expire_time"] is not None:
-                    time = datetime.now().replace(microsecond=0) + \
-                           timedelta(seconds=guild["role"]["expire_time"])
-                    timestamp = f"<t:{int(datetime.timestamp(time))}:R>"
-                    duration = period(timedelta(seconds=guild["role"]["expire_time"]))
+        try:
+            # The connection is handed back before any Discord call.
+            async with self.bot.pool.acquire() as db:
+                claim: Claim = await db.redeem(guild_id=interaction.guild_id, code=code, user_id=interaction.user.id)
+            role = interaction.guild.get_role(claim.role_id)
+            # Role time format
+            if claim.role_expire_time is not None:
+                time = datetime.now().replace(microsecond=0) + \
+                       timedelta(seconds=claim.role_expire_time)
+                timestamp = f"<t:{int(datetime.timestamp(time))}:R>"
+                duration = period(timedelta(seconds=claim.role_expire_time))
+            else:
+                duration = "lifetime"
+                timestamp = duration
+            if role is not None:
+                bot_role = interaction.guild.get_member(self.bot.user.id).top_role
+                # Checks if the bot top role higher than the role that will give.
+                if bot_role > role:
+                    await interaction.user.add_roles(role)
+                    description = \
+                        f"> ||{code}||\n\n" \
+                        f"Role: <@&{claim.role_id}>\n " \
+                        f"Duration: `{duration}`"
+                    embed = Embed(title="Successfully redeemed", description=description, colour=0x738adb)
+                    await interaction.response.send_message(embed=embed, ephemeral=True)
                 else:
-                    duration = "lifetime"
-                    timestamp = duration
-                await self.logger(interaction=interaction, guild=guild, code=code, timestamp=timestamp)
-                if role is not None:
-                    bot_role = interaction.guild.get_member(self.bot.user.id).top_role
-                    # Checks if the bot top role higher than the role that will give.
-                    if bot_role > role:
-                        await interaction.user.add_roles(role)
-                        description = \
-                            f"> ||{code}||\n\n" \
-                            f"Role: <@&{guild['role']['id']}>\n " \
-                            f"Duration: `{duration}`"
-                        embed = Embed(title="Successfully redeemed", description=description, colour=0x738adb)
-                        await interaction.response.send_message(embed=embed, ephemeral=True)
-                    else:
-                        embed = embed_wrong(msg=f"Unable to add role\n"
-                                                f"{bot_role.mention} Role have to be Higher then {role.mention}\n"
-                                                f"> Please contact server administrator")
-                        await interaction.response.send_message(embed=embed, ephemeral=True)
-                else:
-                    embed = embed_wrong(msg=f"Role not found\n> Please contact server administrator")
-                    await interaction.response.send_message(embed=embed)
+                    embed = embed_wrong(msg=f"Unable to add role\n"
+                                            f"{bot_role.mention} Role have to be Higher then {role.mention}\n"
+                                            f"> Please contact server administrator")
+                    await interaction.response.send_message(embed=embed, ephemeral=True)
+            else:
+                embed = embed_wrong(msg=f"Role not found\n> Please contact server administrator")
+                await interaction.response.send_message(embed=embed)
+            # Logging, after the reply so a slow log channel never delays it.
+            self.logger(interaction=interaction, claim=claim, code=code, timestamp=timestamp)
 
-            except Errors.CodeNotFound:
-                embed = embed_wrong(msg=f"Code is not found")
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Errors.CodeNotFound:
+            interaction.extras["outcome"] = "CodeNotFound"
+            embed = embed_wrong(msg=f"Code is not found")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            except Errors.CodeExpired:
-                embed = embed_wrong(msg=f"Code is expired")
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Errors.CodeExpired:
+            interaction.extras["outcome"] = "CodeExpired"
+            embed = embed_wrong(msg=f"Code is expired")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            except Errors.CodeAlreadyUsed:
-                embed = embed_wrong(msg=f"Code is already used")
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Errors.CodeAlreadyUsed:
+            interaction.extras["outcome"] = "CodeAlreadyUsed"
+            embed = embed_wrong(msg=f"Code is already used")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @staticmethod
-    async def logger(interaction: Interaction, guild: dict, code: str, timestamp: str) -> None:
-        if guild["guild"]["channel_id"] is not None:
-            channel = interaction.guild.get_channel(guild["guild"]["channel_id"])
+    def logger(self, interaction: Interaction, claim: Claim, code: str, timestamp: str) -> None:
+        if claim.guild.channel_id is not None:
+            channel = interaction.guild.get_channel(claim.guild.channel_id)
             if channel is not None:
                 description = \
                     f"> ||{code}||\n\n" \
-                    f"Role: <@&{guild['role']['id']}>\n " \
+                    f"Role: <@&{claim.role_id}>\n " \
                     f"Expire: {timestamp}"
                 embed = Embed(title="Redeemed a code", description=description, colour=0xf1c40f)
                 if interaction.user.avatar is None:
@@ -105,7 +109,7 @@ class Redeem(Cog):
                 else:
                     embed.set_author(name=interaction.user,
                                      icon_url=interaction.user.avatar.url)
-                await channel.send(embed=embed)
+                self.bot.dispatcher.dispatch(channel=channel, embed=embed)
 
 
 async def setup(bot) -> None: await bot.add_cog(Redeem(bot))
@@ -24,7 +24,7 @@ DEALINGS IN THE SOFTWARE.
 
 # ------ Core ------
 from ..bot import Bot
-from ..models import Database, Errors
+from ..models import Errors, Guild
 from ..utils import embed_wrong
 # ------ Discord ------
 from discord import Interaction, app_commands, Embed
@@ -43,20 +43,20 @@ class Remove(Cog):
     @app_commands.command(name="remove", description="Remove a code.")
     @app_commands.default_permissions(administrator=True)
     async def slash(self, interaction: Interaction, code: str) -> None:
-        async with Database() as db:
+        async with self.bot.pool.acquire() as db:
             try:
                 guild = await db.remove_code(guild_id=interaction.guild_id, code=code)
                 embed = Embed(title="Code as been removed!", description=f"> `{code}`", colour=0x738adb)
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await self.logger(interaction=interaction, guild=guild, code=code)
+                self.logger(interaction=interaction, guild=guild, code=code)
             except Errors.CodeNotFound:
+                interaction.extras["outcome"] = "CodeNotFound"
                 embed = embed_wrong(msg=f"Code is not found")
                 await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @staticmethod
-    async def logger(interaction: Interaction, guild: dict, code: str) -> None:
-        if guild["channel_id"] is not None:
-            channel = interaction.guild.get_channel(guild["channel_id"])
+    def logger(self, interaction: Interaction, guild: Guild, code: str) -> None:
+        if guild.channel_id is not None:
+            channel = interaction.guild.get_channel(guild.channel_id)
             if channel is not None:
                 embed = Embed(title="Removed a code", description=f"> `{code}`", colour=0xe74c3c)
                 if interaction.user.avatar is None:
@@ -64,7 +64,7 @@ class Remove(Cog):
                 else:
                     embed.set_author(name=interaction.user,
                                      icon_url=interaction.user.avatar.url)
-                await channel.send(embed=embed)
+                self.bot.dispatcher.dispatch(channel=channel, embed=embed)
 
 
 async def setup(bot) -> None: await bot.add_cog(Remove(bot))
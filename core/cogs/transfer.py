@@ -0,0 +1,132 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# ------ Core ------
+from ..bot import Bot
+from ..models import transfer
+from ..utils import embed_wrong
+# ------ Discord ------
+from discord import Interaction, app_commands, Embed, Attachment, File
+from discord.ext.commands import Cog
+# ------ Files ------
+from aiohttp import ClientSession, ClientError
+from codecs import getincrementaldecoder
+from io import StringIO, TextIOWrapper
+from tempfile import TemporaryFile
+from typing import BinaryIO, Literal
+
+# Bytes of an imported file read at once.
+CHUNK: int = 65_536
+
+
+class Transfer(Cog):
+    __slots__ = "bot"
+
+    def __init__(self, bot: Bot) -> None:
+        """
+        Import and export codes slash commands
+        """
+        self.bot = bot
+
+    @app_commands.command(name="import", description="Import codes from a CSV or JSONL file.")
+    @app_commands.describe(file="Columns: code, role, expires_at, max_uses, role_duration (seconds)")
+    @app_commands.default_permissions(administrator=True)
+    async def import_codes(self, interaction: Interaction, file: Attachment) -> None:
+        fmt = "jsonl" if file.filename.lower().endswith((".jsonl", ".json")) else "csv"
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # Spooled to a temporary file so the memory use does not grow with the file.
+        with TemporaryFile() as fp:
+            try:
+                await self.download(attachment=file, fp=fp)
+            except UnicodeDecodeError:
+                embed = embed_wrong(msg=f"The file has to be UTF-8 text.")
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            except ClientError:
+                embed = embed_wrong(msg=f"Unable to download the file.")
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            fp.seek(0)
+            imported, errors = await transfer.import_codes(pool=self.bot.pool, guild_id=interaction.guild_id,
+                                                           lines=TextIOWrapper(fp, encoding="utf-8-sig", newline=""),
+                                                           fmt=fmt)
+        description = f"Imported `{imported}` codes, skipped `{len(errors)}` rows."
+        embed = Embed(title="Codes as been imported!", description=description, colour=0x738adb)
+        if errors:
+            # Every skipped row with its reason.
+            report = "".join(f"line {line}: {reason}\n" for line, reason in errors)
+            await interaction.followup.send(embed=embed, ephemeral=True,
+                                            file=File(fp=StringIO(report), filename="errors.txt"))
+        else:
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        # Logging
+        await self.logger(interaction=interaction, title="Imported codes", description=description)
+
+    @app_commands.command(name="export", description="Export the codes or the redemption history.")
+    @app_commands.rename(fmt="format")
+    @app_commands.default_permissions(administrator=True)
+    async def export_codes(self, interaction: Interaction, table: Literal["codes", "redemptions"] = "codes",
+                           fmt: Literal["csv", "jsonl"] = "csv") -> None:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # Written to a temporary file so the memory use does not grow with the guild.
+        with TemporaryFile() as fp:
+            async for line in transfer.export(pool=self.bot.pool, guild_id=interaction.guild_id, table=table,
+                                              fmt=fmt):
+                fp.write(line.encode())
+            fp.seek(0)
+            await interaction.followup.send(file=File(fp=fp, filename=f"{table}.{fmt}"), ephemeral=True)
+        await self.logger(interaction=interaction, title="Exported codes", description=f"> `{table}.{fmt}`")
+
+    @staticmethod
+    async def download(attachment: Attachment, fp: BinaryIO) -> None:
+        """
+        Writes an attachment to `fp` chunk by chunk, checking it is UTF-8 text on the way.
+
+        Nothing is imported from a file that turns out not to be text.
+        """
+        decoder = getincrementaldecoder("utf-8")()
+        async with ClientSession() as session:
+            async with session.get(attachment.url) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(CHUNK):
+                    decoder.decode(chunk)
+                    fp.write(chunk)
+        decoder.decode(b"", final=True)
+
+    async def logger(self, interaction: Interaction, title: str, description: str) -> None:
+        async with self.bot.pool.acquire() as db:
+            guild = await db.get_guild(guild_id=interaction.guild_id)
+        if guild.channel_id is not None:
+            channel = interaction.guild.get_channel(guild.channel_id)
+            if channel is not None:
+                embed = Embed(title=title, description=description, colour=0x1f8b4c)
+                if interaction.user.avatar is None:
+                    embed.set_author(name=interaction.user)
+                else:
+                    embed.set_author(name=interaction.user,
+                                     icon_url=interaction.user.avatar.url)
+                self.bot.dispatcher.dispatch(channel=channel, embed=embed)
+
+
+async def setup(bot) -> None: await bot.add_cog(Transfer(bot))
@@ -9,5 +9,20 @@ Modules of bot.
 """
 
 from .logger import logger
+from .storage import Storage
 from .database import Database
+from .records import Guild, Code, Claim, Redemption, ExpiredRole
+from .pool import Pool
+from .memory import MemoryDatabase, MemoryPool
+from .writer import Writer
+from .scheduler import Scheduler
+from .executor import Executor
+from .dispatcher import Dispatcher
+from .cache import GuildCache, CodeCache
+from .bloom import BloomFilter, CodeFilter
+from .generator import CodeGenerator
+from .metrics import Metrics, RequestCounter
+from .profiler import Profiler
+from . import transfer
+from .migrations import migrate
 from .errors import Errors
@@ -0,0 +1,92 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from hashlib import blake2b
+from math import ceil, log
+
+
+class BloomFilter(object):
+    __slots__ = ('capacity', 'count', 'size', 'hashes', '_bits')
+
+    def __init__(self, capacity: int = 1024, error_rate: float = 0.01):
+        """
+        Fixed size set of strings that answers "definitely not" or "maybe".
+
+        :param capacity:`int` Items it can hold before the error rate is exceeded.
+        :param error_rate:`float` False positive rate at full capacity.
+        """
+        self.capacity = capacity
+        self.count: int = 0
+        self.size: int = ceil(-capacity * log(error_rate) / (log(2) ** 2))
+        self.hashes: int = max(1, round(self.size / capacity * log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class CodeFilter(object):
+    __slots__ = ('loaded', 'capacity', 'error_rate', '_guilds')
+
+    def __init__(self, capacity: int = 1024, error_rate: float = 0.01):
+        """
+        Per guild bloom filters of the existing codes.
+
+        A guild grows by stacking a filter twice as large and twice as
+        strict once the last one is full, so the overall false positive
+        rate stays under twice `error_rate`. Removed codes stay in until
+        the next rebuild, which only costs a database lookup.
+
+        :param capacity:`int` Capacity of the first filter of a guild.
+        :param error_rate:`float` False positive rate of the first filter.
+        """
+        self.loaded: bool = False
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._guilds: dict[int, list[BloomFilter]] = {}
+
+    def add(self, guild_id: int, code: str) -> None:
+        layers = self._guilds.setdefault(guild_id, [])
+        if not layers or layers[-1].count >= layers[-1].capacity:
+            capacity = self.capacity if not layers else layers[-1].capacity * 2
+            layers.append(BloomFilter(capacity=capacity, error_rate=self.error_rate / 2 ** len(layers)))
+        layers[-1].add(code)
+
+    def might_contain(self, guild_id: int, code: str) -> bool:
+        """
+        :return:`bool` False only when the code surely does not exist.
+        """
+        if not self.loaded:
+            return True
+        return any(code in layer for layer in self._guilds.get(guild_id, ()))
@@ -0,0 +1,106 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from collections import OrderedDict
+from time import monotonic
+from .records import Guild
+
+
+class GuildCache(object):
+    __slots__ = ('_guilds',)
+
+    def __init__(self):
+        """
+        Settings of every known guild, kept in sync by Database.set_channel.
+        """
+        self._guilds: dict[int, Guild] = {}
+
+    def __len__(self) -> int:
+        return len(self._guilds)
+
+    def get(self, guild_id: int) -> Guild | None:
+        """
+        :return:`Guild | None` None when the guild is not cached.
+        """
+        return self._guilds.get(guild_id)
+
+    def set(self, guild: Guild) -> None:
+        self._guilds[guild.id] = guild
+
+    def load(self, guilds: list[Guild]) -> None:
+        """
+        Replaces the cache with the guilds read from the database.
+        """
+        self._guilds = {guild.id: guild for guild in guilds}
+
+
+class CodeCache(object):
+    __slots__ = ('size', 'ttl', 'negative_ttl', 'hits', 'misses', '_entries')
+
+    # Stored for codes known not to exist.
+    absent = object()
+
+    def __init__(self, size: int = 10_000, ttl: float = 60.0, negative_ttl: float = 10.0):
+        """
+        Bounded LRU of (guild_id, code) lookups with short-lived negative entries.
+
+        :param size:`int` Entries kept before the least recently used is dropped.
+        :param ttl:`float` Seconds a found code is kept.
+        :param negative_ttl:`float` Seconds a missing code is kept.
+        """
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[tuple[int, str], tuple[float, object]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, guild_id: int, code: str) -> object | None:
+        """
+        :return: The cached code, `CodeCache.absent` for a known missing code or None on a miss.
+        """
+        key = (guild_id, code)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, guild_id: int, code: str, value: object) -> None:
+        ttl = self.negative_ttl if value is self.absent else self.ttl
+        key = (guild_id, code)
+        self._entries[key] = (monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, guild_id: int, code: str) -> None:
+        self._entries.pop((guild_id, code), None)
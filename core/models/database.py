@@ -22,230 +22,515 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 
-from aiosqlite import connect, Connection, Cursor
-from datetime import datetime, timedelta
+from aiosqlite import Connection, Cursor
+from functools import wraps
+from sqlite3 import IntegrityError
+from time import time
+from typing import Callable
 from .errors import Errors
+from .scheduler import Scheduler
+from .cache import GuildCache, CodeCache
+from .bloom import CodeFilter
+from .profiler import Profiler, Query
+from .records import Guild, Code, Claim, Redemption, ExpiredRole, row_factory
+from .storage import Storage
 
+# Columns of the Code record, in field order.
+_CODE_COLUMNS: str = "id, code, guild_id, expires_at, max_uses, uses_count, role_id, role_expire_time, created_at"
 
-class Database(object):
-    __slots__ = ('connection', 'cursor')
 
-    def __init__(self):
-        self.connection: Connection | None = None
+def write(method):
+    """
+    Sends a write method to the writer when the database has one.
+    """
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if self.writer is not None and self.hooks is None:
+            # The lent connection is not needed while the write waits for its batch.
+            await self.release()
+            return await self.writer.submit(lambda db: method(db, *args, **kwargs))
+        return await method(self, *args, **kwargs)
+    return wrapper
+
+
+class Database(Storage):
+    __slots__ = ('connection', 'cursor', 'scheduler', 'guilds', 'codes', 'filters', 'profiler', 'writer', 'hooks',
+                 'pool')
+
+    def __init__(self, connection: Connection | None = None, scheduler: Scheduler | None = None,
+                 guilds: GuildCache | None = None, codes: CodeCache | None = None,
+                 filters: CodeFilter | None = None, profiler: Profiler | None = None,
+                 writer=None, hooks: list[Callable[[], None]] | None = None, pool=None):
+        """
+        :param connection:`aiosqlite.Connection` None to borrow one from `pool` on the first statement.
+        :param writer:`Writer` Runs the write methods, None to run them on `connection`.
+        :param hooks:`list` Set by the writer, collects what to do once its transaction commits.
+        :param pool:`Pool` Lends the connection, it is handed back by `release`.
+        """
+        self.connection: Connection | None = connection
         self.cursor: Cursor | None = None
+        self.scheduler: Scheduler | None = scheduler
+        self.guilds: GuildCache = guilds if guilds is not None else GuildCache()
+        self.codes: CodeCache = codes if codes is not None else CodeCache()
+        self.filters: CodeFilter = filters if filters is not None else CodeFilter()
+        self.profiler: Profiler | None = profiler
+        self.writer = writer
+        self.hooks: list[Callable[[], None]] | None = hooks
+        self.pool = pool
 
     async def __aenter__(self):
-        self.connection = await connect(database="guilds.db", detect_types=3)
-        self.cursor = await self.connection.cursor()
-
-        # guilds(*id, created_at)
-        await self.cursor.execute("""CREATE TABLE IF NOT EXISTS guilds(
-                                                            id INTEGER PRIMARY KEY,
-                                                            channel INTEGER,
-                                                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL);
-                                                            """)
-
-        # Roles(*id, role_id, expire_time)
-        await self.cursor.execute("""CREATE TABLE IF NOT EXISTS roles(
-                                                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                                            role_id INTEGER NOT NULL,
-                                                            expire_time INTEGER);
-                                                            """)
-
-        # Codes(*id, code, expires_at, max_uses, uses_count, **role_id, **guild_id, created_at)
-        await self.cursor.execute("""CREATE TABLE IF NOT EXISTS codes(
-                                                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                                            code TEXT NOT NULL,
-                                                            expires_at TIMESTAMP,
-                                                            max_uses INTEGER,
-                                                            uses_count INTEGER DEFAULT 0,
-                                                            role_id INTEGER NOT NULL,
-                                                            guild_id INTEGER NOT NULL,
-                                                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
-                                                            FOREIGN KEY(guild_id) REFERENCES guilds(id),
-                                                            FOREIGN KEY(role_id) REFERENCES roles(id));
-                                                            """)
-
-        # Redemption(user_id, **role_id, **code_id, expires_at, redeemed_at)
-        await self.cursor.execute("""CREATE TABLE IF NOT EXISTS redemption(  
-                                                            user_id INTEGER NOT NULL,
-                                                            role_id INTEGER NOT NULL,
-                                                            code_id INTEGER NOT NULL,
-                                                            expires_at TIMESTAMP,
-                                                            redeemed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
-                                                            FOREIGN KEY (code_id) REFERENCES codes(id),
-                                                            FOREIGN KEY (role_id) REFERENCES roles(id));
-                                                            """)
         return self
 
-    async def get_guild(self, guild_id: int) -> dict:
+    async def _cursor(self) -> Cursor:
+        if self.cursor is None:
+            if self.connection is None:
+                self.connection = await self.pool.lend()
+            self.cursor = await self.connection.cursor()
+        return self.cursor
+
+    async def release(self) -> None:
+        """
+        Hands the lent connection back to the pool, the next statement borrows one again.
+        """
+        if self.cursor is not None:
+            await self.cursor.close()
+            self.cursor = None
+        if self.pool is not None and self.connection is not None:
+            connection, self.connection = self.connection, None
+            await self.pool.release(connection=connection)
+
+    async def commit(self) -> None:
+        # The writer commits a whole batch at once.
+        if self.hooks is None and self.connection is not None:
+            await self.connection.commit()
+
+    async def rollback(self) -> None:
+        # The writer rolls back to the savepoint of the request.
+        if self.hooks is None and self.connection is not None:
+            await self.connection.rollback()
+
+    def on_commit(self, hook: Callable[[], None]) -> None:
+        """
+        Updates the caches once the change is committed, never before.
+        """
+        if self.hooks is None:
+            hook()
+        else:
+            self.hooks.append(hook)
+
+    async def execute(self, sql: str, parameters: tuple = (), record: type | None = None) -> Cursor | Query:
+        """
+        Runs one statement on the cursor, timed when a profiler is set.
+
+        :param record:`type` Record the fetched rows are built as, plain tuples when None.
+        """
+        cursor = await self._cursor()
+        cursor.row_factory = None if record is None else row_factory(record)
+        if self.profiler is None:
+            return await cursor.execute(sql, parameters)
+        return await self.profiler.execute(connection=self.connection, cursor=cursor, sql=sql,
+                                           parameters=parameters)
+
+    async def executemany(self, sql: str, parameters: list) -> Cursor | Query:
+        cursor = await self._cursor()
+        cursor.row_factory = None
+        if self.profiler is None:
+            return await cursor.executemany(sql, parameters)
+        return await self.profiler.executemany(connection=self.connection, cursor=cursor, sql=sql,
+                                               parameters=parameters)
+
+    async def get_guilds(self) -> list[Guild]:
+        """
+        Reads the log channel of every guild in one query.
+
+        :return:`list[Guild]`
+        """
+        get_guilds = await self.execute("""SELECT id, channel FROM guilds;""", record=Guild)
+        return await get_guilds.fetchall()
+
+    async def get_guild(self, guild_id: int) -> Guild:
+        cached = self.guilds.get(guild_id=guild_id)
+        if cached is not None:
+            return cached
         # -------------------------
         # Checks if the guild exists.
-        get_guild = await self.cursor.execute("""SELECT * FROM guilds WHERE id = ?;""", (guild_id,))
-        fetch_guild = await get_guild.fetchone()
+        get_guild = await self.execute("""SELECT id, channel FROM guilds WHERE id = ?;""", (guild_id,), record=Guild)
+        fetch_guild: Guild | None = await get_guild.fetchone()
         if fetch_guild is None:
-            await self.cursor.execute("""INSERT INTO guilds(id) VALUES(?);""", (guild_id,))
-            await self.connection.commit()
-            return {"guild_id": guild_id, "channel_id": None}
-        else:
-            return {"id": fetch_guild[0], "channel_id": fetch_guild[1]}
+            return await self.add_guild(guild_id=guild_id)
+        self.guilds.set(guild=fetch_guild)
+        return fetch_guild
+
+    @write
+    async def add_guild(self, guild_id: int) -> Guild:
+        await self.execute("""INSERT OR IGNORE INTO guilds(id) VALUES(?);""", (guild_id,))
+        # Another request may have added it with a channel first.
+        get_guild = await self.execute("""SELECT id, channel FROM guilds WHERE id = ?;""", (guild_id,), record=Guild)
+        guild: Guild = await get_guild.fetchone()
+        await self.commit()
+        self.on_commit(lambda: self.guilds.set(guild=guild))
+        return guild
+
+    async def iter_codes(self, chunk: int = 5000) -> iter:
+        """
+        Streams (guild_id, code) of every code, used to build the filters.
+        """
+        get_codes = await self.execute("""SELECT guild_id, code FROM codes;""")
+        while rows := await get_codes.fetchmany(chunk):
+            for row in rows:
+                yield row[0], row[1]
+
+    async def code_exists(self, guild_id: int, code: str) -> bool:
+        """
+        Checks if a code exists, answered in memory unless the filter says maybe.
 
-    async def get_code(self, guild_id: int, code: str) -> dict:
+        :return:`bool`
+        """
+        if not self.filters.might_contain(guild_id=guild_id, code=code):
+            return False
+        try:
+            await self.get_code(guild_id=guild_id, code=code)
+            return True
+        except Errors.CodeNotFound:
+            return False
+
+    async def get_code(self, guild_id: int, code: str) -> Code:
+        if not self.filters.might_contain(guild_id=guild_id, code=code):
+            raise Errors.CodeNotFound(code=code)
+        cached = self.codes.get(guild_id=guild_id, code=code)
+        if cached is CodeCache.absent:
+            raise Errors.CodeNotFound(code=code)
+        if cached is not None:
+            return cached
         # -------------------------
         # Checks if the code exists.
-        sql: str = """SELECT * FROM codes WHERE code = ? AND guild_id = ?;"""
-        get_code = await self.cursor.execute(sql, (code, guild_id))
-        fetch_code = await get_code.fetchone()
+        sql: str = f"""SELECT {_CODE_COLUMNS} FROM codes WHERE code = ? AND guild_id = ?;"""
+        get_code = await self.execute(sql, (code, guild_id), record=Code)
+        fetch_code: Code | None = await get_code.fetchone()
         if fetch_code is not None:
-            sql = """SELECT * FROM roles where id = ?;"""
-            get_role = await self.cursor.execute(sql, (fetch_code[5],))
-            fetch_role = await get_role.fetchone()
-            return {"expires_at": fetch_code[2], "max_uses": fetch_code[3], "uses_count": fetch_code[4],
-                    "role": {"id": fetch_role[1], "expire_time": fetch_role[2]}}
+            self.codes.set(guild_id=guild_id, code=code, value=fetch_code)
+            return fetch_code
         else:
+            self.codes.set(guild_id=guild_id, code=code, value=CodeCache.absent)
             raise Errors.CodeNotFound(code=code)
 
-    async def redeem(self, guild_id: int, code: str, user_id: int) -> dict:
-        # -------------------------
-        # Checks if the code exists.
-        sql: str = """SELECT * FROM codes WHERE code = ? AND guild_id = ?;"""
-        get_code = await self.cursor.execute(sql, (code, guild_id))
-        fetch_code = await get_code.fetchone()
-        if fetch_code is not None:
-            # --------------------------------
-            # checks if the code is fully used.
-            if fetch_code[3] is not None and fetch_code[3] == fetch_code[4]:
-                raise Errors.CodeExpired(code=code)
-            else:
-                # -----------------------------
-                # Checks if the code is expired.
-                if (fetch_code[2] is not None) and (datetime.now() >= fetch_code[2]):
-                    raise Errors.CodeExpired(code=code)
-                else:
-                    # ---------------------------------------------
-                    # Checks if the user already used the same code.
-                    sql = """SELECT * FROM redemption where user_id = ? AND code_id = ?;"""
-                    get_redemption = await self.cursor.execute(sql, (user_id, fetch_code[0]))
-                    if await get_redemption.fetchone() is None:
-                        sql = """SELECT * FROM roles where id = ?;"""
-                        get_role = await self.cursor.execute(sql, (fetch_code[5],))
-                        fetch_role = await get_role.fetchone()
-                        # --------------------------------------
-                        # Adding user to the redemption database.
-                        sql = """INSERT INTO redemption(user_id, role_id, code_id, expires_at) VALUES(?, ?, ?, ?);"""
-                        if fetch_role[-1] is None:
-                            time = None
-                        else:
-                            time = datetime.now().replace(microsecond=0) + timedelta(seconds=fetch_role[-1])
-                        await self.cursor.execute(sql, (user_id, fetch_role[0], fetch_code[0], time))
-                        # -----------------------------------
-                        # Updating the uses count of the code.
-                        sql = """UPDATE codes SET uses_count = ? WHERE id = ?;"""
-                        await self.cursor.execute(sql, (int(fetch_code[4]) + 1, fetch_code[0]))
-                        await self.connection.commit()
-                        # retrieving logging channel.
-                        get_guild = await self.get_guild(guild_id=guild_id)
-                        return {"guild": get_guild,
-                                "role": {"id": fetch_role[1], "expire_time": fetch_role[2]}}
-                    else:
-                        raise Errors.CodeAlreadyUsed(code=code)
-        else:
+    async def redeem(self, guild_id: int, code: str, user_id: int) -> Claim:
+        # Codes that can not exist or were wrong recently never reach the database.
+        if not self.filters.might_contain(guild_id=guild_id, code=code):
+            raise Errors.CodeNotFound(code=code)
+        if self.codes.get(guild_id=guild_id, code=code) is CodeCache.absent:
             raise Errors.CodeNotFound(code=code)
+        return await self.claim(guild_id=guild_id, code=code, user_id=user_id)
+
+    @write
+    async def claim(self, guild_id: int, code: str, user_id: int) -> Claim:
+        """
+        Claims one use of a code for a user and records the redemption.
+
+        :return:`Claim` The guild and the role to give.
+        """
+        # ------------------------------------------------------------
+        # Claiming one use of the code, the limit, expiry and duplicate
+        # checks run in the same statement as the increment so concurrent
+        # redeems can never go over max_uses.
+        sql: str = """UPDATE codes SET uses_count = uses_count + 1
+                      WHERE code = ? AND guild_id = ?
+                      AND (max_uses IS NULL OR uses_count < max_uses)
+                      AND (expires_at IS NULL OR expires_at > ?)
+                      AND NOT EXISTS (SELECT 1 FROM redemption WHERE code_id = codes.id AND user_id = ?)
+                      RETURNING id, role_id, role_expire_time;"""
+        claim = await self.execute(sql, (code, guild_id, int(time()), user_id))
+        fetch_claim = await claim.fetchone()
+        if fetch_claim is None:
+            await self.rollback()
+            raise await self.redeem_error(guild_id=guild_id, code=code)
+        # --------------------------------------
+        # Adding user to the redemption database.
+        expires_at = None if fetch_claim[2] is None else int(time()) + fetch_claim[2]
+        sql = """INSERT INTO redemption(user_id, role_id, code_id, expires_at) VALUES(?, ?, ?, ?);"""
+        await self.execute(sql, (user_id, fetch_claim[1], fetch_claim[0], expires_at))
+        await self.commit()
 
+        def committed() -> None:
+            # The cached uses count is stale now.
+            self.codes.invalidate(guild_id=guild_id, code=code)
+            if (expires_at is not None) and (self.scheduler is not None):
+                self.scheduler.schedule(deadline=expires_at)
+        self.on_commit(committed)
+        # retrieving logging channel.
+        get_guild = await self.get_guild(guild_id=guild_id)
+        return Claim(guild=get_guild, role_id=fetch_claim[1], role_expire_time=fetch_claim[2])
+
+    async def redeem_error(self, guild_id: int, code: str) -> Exception:
+        """
+        Explains why a redeem claimed nothing, only runs on the failure path.
+
+        :return:`Exception`
+        """
+        sql: str = """SELECT expires_at, max_uses, uses_count FROM codes WHERE code = ? AND guild_id = ?;"""
+        get_code = await self.execute(sql, (code, guild_id))
+        fetch_code = await get_code.fetchone()
+        if fetch_code is None:
+            self.codes.set(guild_id=guild_id, code=code, value=CodeCache.absent)
+            return Errors.CodeNotFound(code=code)
+        # --------------------------------
+        # checks if the code is fully used.
+        if fetch_code[1] is not None and fetch_code[2] >= fetch_code[1]:
+            return Errors.CodeExpired(code=code)
+        # -----------------------------
+        # Checks if the code is expired.
+        if (fetch_code[0] is not None) and (time() >= fetch_code[0]):
+            return Errors.CodeExpired(code=code)
+        return Errors.CodeAlreadyUsed(code=code)
+
+    @write
     async def set_channel(self, guild_id: int, channel_id: int) -> bool:
         # -------------------------
         # Checks if the guild exists.
-        get_guild = await self.cursor.execute("""SELECT * FROM guilds WHERE id = ?;""", (guild_id,))
+        get_guild = await self.execute("""SELECT channel FROM guilds WHERE id = ?;""", (guild_id,))
         fetch_guild = await get_guild.fetchone()
         if fetch_guild is None:
-            await self.cursor.execute("""INSERT INTO guilds(id, channel) VALUES(?, ?);""", (guild_id, channel_id))
+            await self.execute("""INSERT INTO guilds(id, channel) VALUES(?, ?);""", (guild_id, channel_id))
+            new_channel = channel_id
         else:
-            if fetch_guild[1] == channel_id:
-                await self.cursor.execute("""UPDATE guilds SET channel = ? WHERE id = ?""", (None, guild_id))
-            else:
-                await self.cursor.execute("""UPDATE guilds SET channel = ? WHERE id = ?""", (channel_id, guild_id))
-
-            await self.connection.commit()
-            return fetch_guild[1] != channel_id
+            # Setting the same channel again turns logging off.
+            new_channel = None if fetch_guild[0] == channel_id else channel_id
+            await self.execute("""UPDATE guilds SET channel = ? WHERE id = ?""", (new_channel, guild_id))
+        await self.commit()
+        # Write-through, the cached channel changes with the row.
+        self.on_commit(lambda: self.guilds.set(guild=Guild(id=guild_id, channel_id=new_channel)))
+        return new_channel is not None
 
-    async def create_code(self, guild_id: int, code: str, expire_in: datetime | None, max_uses: int | None,
-                          role_id: int, role_expire_time: int | None) -> dict:
+    @write
+    async def create_code(self, guild_id: int, code: str, expire_in: int | None, max_uses: int | None,
+                          role_id: int, role_expire_time: int | None) -> Guild:
         # -------------------------
         # Checks if the guild exists.
         get_guild = await self.get_guild(guild_id=guild_id)
 
         # -------------------------
         # Checks if the code exists.
-        get_code = await self.cursor.execute("""SELECT * FROM codes WHERE code = ? AND guild_id = ?;""",
-                                             (code, guild_id))
+        get_code = await self.execute("""SELECT 1 FROM codes WHERE code = ? AND guild_id = ?;""",
+                                      (code, guild_id))
         if await get_code.fetchone() is None:
-            # ----------------------------
-            # Adding the role and the code.
-            sql: str = """INSERT INTO roles(role_id, expire_time) VALUES(?, ?);"""
-            role_id = await self.cursor.execute(sql, (role_id, role_expire_time))
-            # --------------------------------------------
-            # Adding the code and linking it with the role.
-            sql = """INSERT INTO codes(code, expires_at, max_uses, guild_id, role_id) VALUES(?, ?, ?, ?, ?);"""
-            await self.cursor.execute(sql, (code, expire_in, max_uses, guild_id, role_id.lastrowid))
-            await self.connection.commit()
+            # Added first so the code is never reported missing once it is committed.
+            self.filters.add(guild_id=guild_id, code=code)
+            # -------------------------------
+            # Adding the code with its role.
+            sql: str = """INSERT INTO codes(code, expires_at, max_uses, guild_id, role_id, role_expire_time)
+                          VALUES(?, ?, ?, ?, ?, ?);"""
+            try:
+                await self.execute(sql, (code, expire_in, max_uses, guild_id, role_id, role_expire_time))
+            except IntegrityError:
+                # Without the writer a concurrent insert can still land between the check and this one.
+                await self.rollback()
+                raise Errors.CodeIsAlreadyExists(code=code)
+            await self.commit()
+            # Dropping a negative entry left by the existence check.
+            self.on_commit(lambda: self.codes.invalidate(guild_id=guild_id, code=code))
             return get_guild
 
         else:
             raise Errors.CodeIsAlreadyExists(code=code)
 
-    async def remove_code(self, guild_id: int, code: str) -> dict:
+    async def count_codes(self, guild_id: int) -> int:
+        get_count = await self.execute("""SELECT COUNT(*) FROM codes WHERE guild_id = ?;""", (guild_id,))
+        return (await get_count.fetchone())[0]
+
+    async def existing_codes(self, guild_id: int, codes: set[str], chunk: int = 500) -> set[str]:
+        """
+        Finds which of `codes` already exist, only the filter's maybes are looked up.
+
+        :return:`set[str]`
+        """
+        maybe = [code for code in codes if self.filters.might_contain(guild_id=guild_id, code=code)]
+        existing: set[str] = set()
+        for i in range(0, len(maybe), chunk):
+            part = maybe[i:i + chunk]
+            sql = f"""SELECT code FROM codes WHERE guild_id = ? AND code IN ({", ".join("?" * len(part))});"""
+            get_codes = await self.execute(sql, (guild_id, *part))
+            existing.update(row[0] for row in await get_codes.fetchall())
+        return existing
+
+    @write
+    async def create_codes(self, guild_id: int, codes: list[str], expire_in: int | None,
+                           max_uses: int | None, role_id: int, role_expire_time: int | None) -> Guild:
+        """
+        Creates many codes in one transaction, none of them if one already exists.
+
+        :return:`Guild`
+        """
+        get_guild = await self.get_guild(guild_id=guild_id)
+        # Checked again here, a code may have been created since the caller checked.
+        await self.check_codes(guild_id=guild_id, codes=codes)
+        for code in codes:
+            self.filters.add(guild_id=guild_id, code=code)
+        sql: str = """INSERT INTO codes(code, expires_at, max_uses, guild_id, role_id, role_expire_time)
+                      VALUES(?, ?, ?, ?, ?, ?);"""
+        try:
+            await self.executemany(sql, [(code, expire_in, max_uses, guild_id, role_id, role_expire_time)
+                                         for code in codes])
+        except IntegrityError:
+            # Without the writer a concurrent insert can still land between the check and this one.
+            await self.rollback()
+            await self.check_codes(guild_id=guild_id, codes=codes)
+            raise
+        await self.commit()
+        self.on_commit(lambda: self.invalidate_codes(guild_id=guild_id, codes=codes))
+        return get_guild
+
+    async def check_codes(self, guild_id: int, codes: list[str]) -> None:
+        """
+        Raises `Errors.CodeIsAlreadyExists` for the first of `codes` that exists.
+        """
+        existing = await self.existing_codes(guild_id=guild_id, codes=set(codes))
+        for code in codes:
+            if code in existing:
+                raise Errors.CodeIsAlreadyExists(code=code)
+
+    def invalidate_codes(self, guild_id: int, codes) -> None:
+        for code in codes:
+            self.codes.invalidate(guild_id=guild_id, code=code)
+
+    @write
+    async def import_codes(self, guild_id: int, rows: list[tuple[int, dict]]) -> list[tuple[int, str]]:
+        """
+        Imports one chunk of parsed rows in a single transaction.
+
+        :param rows:`list` (line, row) pairs, see core.models.transfer.parse_codes.
+        :return:`list[tuple[int, str]]` (line, reason) of the skipped rows.
+        """
+        # Makes sure the guild row exists.
+        await self.get_guild(guild_id=guild_id)
+        errors: list[tuple[int, str]] = []
+        existing = await self.existing_codes(guild_id=guild_id, codes={row["code"] for _, row in rows})
+        seen: set[str] = set()
+        values: list[tuple] = []
+        for line, row in rows:
+            if row["code"] in existing or row["code"] in seen:
+                errors.append((line, f"Code {row['code']} is already exists."))
+                continue
+            seen.add(row["code"])
+            values.append((row["code"], row["expires_at"], row["max_uses"], guild_id, row["role"],
+                           row["role_duration"]))
+        for code in seen:
+            self.filters.add(guild_id=guild_id, code=code)
+        sql: str = """INSERT INTO codes(code, expires_at, max_uses, guild_id, role_id, role_expire_time)
+                      VALUES(?, ?, ?, ?, ?, ?);"""
+        await self.executemany(sql, values)
+        await self.commit()
+        self.on_commit(lambda: self.invalidate_codes(guild_id=guild_id, codes=seen))
+        return errors
+
+    async def export_codes(self, guild_id: int, chunk: int = 1000) -> iter:
+        """
+        Streams the codes of a guild.
+        """
+        sql: str = f"""SELECT {_CODE_COLUMNS} FROM codes WHERE guild_id = ? ORDER BY id;"""
+        get_codes = await self.execute(sql, (guild_id,), record=Code)
+        while rows := await get_codes.fetchmany(chunk):
+            for row in rows:
+                yield row
+
+    async def export_redemptions(self, guild_id: int, chunk: int = 1000) -> iter:
+        """
+        Streams the redemption history of a guild.
+        """
+        sql: str = """SELECT redemption.user_id, codes.code, redemption.role_id, redemption.expires_at,
+                      redemption.redeemed_at
+                      FROM redemption
+                      JOIN codes ON codes.id = redemption.code_id
+                      WHERE codes.guild_id = ? ORDER BY redemption.rowid;"""
+        get_redemptions = await self.execute(sql, (guild_id,), record=Redemption)
+        while rows := await get_redemptions.fetchmany(chunk):
+            for row in rows:
+                yield row
+
+    @write
+    async def remove_code(self, guild_id: int, code: str) -> Guild:
         # -------------------------
         # Checks if the guild exists.
         get_guild = await self.get_guild(guild_id=guild_id)
 
         # -------------------------
         # Checks if the code exists.
-        sql: str = """SELECT * FROM codes WHERE code = ? AND guild_id = ?;"""
-        get_code = await self.cursor.execute(sql, (code, guild_id))
+        sql: str = """SELECT id FROM codes WHERE code = ? AND guild_id = ?;"""
+        get_code = await self.execute(sql, (code, guild_id))
         fetch_code = await get_code.fetchone()
         if fetch_code is not None:
             # ----------------------------
             # Deleting the code from codes.
             sql = """DELETE FROM codes WHERE id = ?;"""
-            await self.cursor.execute(sql, (fetch_code[0],))
-
-            # ----------------------------
-            # Deleting the role from roles.
-            sql = """DELETE FROM roles WHERE id = ?;"""
-            await self.cursor.execute(sql, (fetch_code[5],))
+            await self.execute(sql, (fetch_code[0],))
 
-            # ----------------------------
-            # Deleting the code from codes.
-            sql = """DELETE FROM redemption WHERE code_id = ? AND role_id = ?;"""
-            await self.cursor.execute(sql, (fetch_code[0], fetch_code[5]))
-            await self.connection.commit()
+            # ---------------------------------------
+            # Deleting the redemptions of the code.
+            sql = """DELETE FROM redemption WHERE code_id = ?;"""
+            await self.execute(sql, (fetch_code[0],))
+            await self.commit()
+            self.on_commit(lambda: self.codes.invalidate(guild_id=guild_id, code=code))
             return get_guild
 
         else:
             raise Errors.CodeNotFound(code=code)
 
-    async def expired_roles(self) -> iter:
-        sql: str = """SELECT * FROM redemption WHERE expires_at IS NOT NULL AND datetime('now', 'localtime') > 
-        expires_at; """
-        get_expired_roles = await self.cursor.execute(sql)
-        fetch_expired_roles = await get_expired_roles.fetchall()
-        get_guild = None
-        for user in fetch_expired_roles:
-            sql = """SELECT * FROM roles, codes where roles.id = ? AND codes.role_id = ? ORDER BY codes.guild_id;"""
-            get_code_role = await self.cursor.execute(sql, (user[2], user[2]))
-            fetch_role = await get_code_role.fetchone()
-            # ---------------------------------
-            # Deleting the user from redemption.
-            sql = """DELETE FROM redemption WHERE user_id = ? AND role_id = ? AND code_id = ?;"""
-            await self.cursor.execute(sql, (user[0], user[1], user[2]))
-            if fetch_role is not None:
-                if get_guild != fetch_role[9]:
-                    get_guild = await self.get_guild(guild_id=fetch_role[9])
-
-                yield {"guild_id": get_guild["id"], "channel_id": get_guild["channel_id"],
-                       "user_id": user[0], "role_id": fetch_role[1]}
-
-        await self.connection.commit()
+    async def next_expiries(self, limit: int) -> list[int]:
+        """
+        Reads the earliest pending role expiry deadlines.
+
+        :return:`list[int]` Epoch seconds.
+        """
+        sql: str = """SELECT DISTINCT expires_at FROM redemption WHERE expires_at IS NOT NULL
+                      ORDER BY expires_at LIMIT ?;"""
+        get_expiries = await self.execute(sql, (limit,))
+        return [row[0] for row in await get_expiries.fetchall()]
+
+    async def count_expired(self, now: int) -> int:
+        """
+        Counts the redemptions whose role is due.
+
+        :return:`int`
+        """
+        sql: str = """SELECT COUNT(*) FROM redemption WHERE expires_at IS NOT NULL AND expires_at <= ?;"""
+        get_count = await self.execute(sql, (now,))
+        return (await get_count.fetchone())[0]
+
+    async def expired_roles(self, now: int, page_size: int = 500) -> iter:
+        """
+        Walks the expired redemptions page by page, keyed on (expires_at, rowid).
+
+        Nothing is deleted, the caller deletes each page with
+        `delete_redemptions` once it is handled, so a crash only replays
+        the pages in flight. The connection goes back to the pool while
+        the caller handles a page.
+        """
+        # --------------------------------------------------------------
+        # One joined query returns everything the loop needs per user,
+        # redemptions whose code is gone come back with NULLs.
+        sql: str = """SELECT redemption.rowid, redemption.expires_at, codes.guild_id, guilds.channel,
+                      redemption.user_id, redemption.role_id
+                      FROM redemption
+                      LEFT JOIN codes ON codes.id = redemption.code_id
+                      LEFT JOIN guilds ON guilds.id = codes.guild_id
+                      WHERE redemption.expires_at IS NOT NULL AND redemption.expires_at <= ?
+                      AND (redemption.expires_at, redemption.rowid) > (?, ?)
+                      ORDER BY redemption.expires_at, redemption.rowid LIMIT ?;"""
+        # Sorts before any stored timestamp.
+        last = (-1, 0)
+        while True:
+            get_expired_roles = await self.execute(sql, (now, *last, page_size), record=ExpiredRole)
+            fetch_expired_roles: list[ExpiredRole] = await get_expired_roles.fetchall()
+            # Removing the roles waits on Discord, never with a connection.
+            await self.release()
+            if not fetch_expired_roles:
+                break
+            last = (fetch_expired_roles[-1].expires_at, fetch_expired_roles[-1].rowid)
+            yield fetch_expired_roles
+
+    @write
+    async def delete_redemptions(self, rowids: list[int]) -> None:
+        await self.executemany("""DELETE FROM redemption WHERE rowid = ?;""", [(rowid,) for rowid in rowids])
+        await self.commit()
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.connection.close()
+        await self.release()
@@ -0,0 +1,103 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# ------ Discord ------
+from discord import TextChannel, Embed, HTTPException, Forbidden, NotFound
+# ------ Async ------
+from asyncio import Task, create_task, sleep, gather
+from collections import deque
+from logging import Logger
+
+
+class Outbox(object):
+    __slots__ = ('channel', 'embeds', 'skipped', 'task')
+
+    def __init__(self, channel: TextChannel):
+        self.channel = channel
+        self.embeds: deque[Embed] = deque()
+        # Events shed while the channel was backed up.
+        self.skipped: int = 0
+        self.task: Task | None = None
+
+
+class Dispatcher(object):
+    __slots__ = ('logger', 'window', 'limit', '_outboxes')
+
+    # Discord accepts up to 10 embeds per message.
+    batch: int = 10
+
+    def __init__(self, logger: Logger, window: float = 1.0, limit: int = 100):
+        """
+        Sends log embeds in the background, batched per channel.
+
+        :param logger:`logging.Logger` Reports failed sends.
+        :param window:`float` Seconds to wait for more events before sending.
+        :param limit:`int` Events queued per channel before the oldest are shed.
+        """
+        self.logger = logger
+        self.window = window
+        self.limit = limit
+        self._outboxes: dict[int, Outbox] = {}
+
+    def dispatch(self, channel: TextChannel | None, embed: Embed) -> None:
+        """
+        Queues an embed, never waits on Discord.
+        """
+        if channel is None:
+            return
+        outbox = self._outboxes.get(channel.id)
+        if outbox is None:
+            outbox = self._outboxes[channel.id] = Outbox(channel=channel)
+        if len(outbox.embeds) >= self.limit:
+            # The channel can not keep up, the oldest events are merged into a summary.
+            outbox.embeds.popleft()
+            outbox.skipped += 1
+        outbox.embeds.append(embed)
+        if outbox.task is None or outbox.task.done():
+            outbox.task = create_task(self._flush(outbox=outbox))
+
+    async def _flush(self, outbox: Outbox) -> None:
+        await sleep(self.window)
+        while outbox.embeds:
+            embeds: list[Embed] = []
+            size = self.batch - 1 if outbox.skipped else self.batch
+            while outbox.embeds and len(embeds) < size:
+                embeds.append(outbox.embeds.popleft())
+            if outbox.skipped:
+                embeds.append(Embed(description=f"{outbox.skipped} more events were skipped.", colour=0x36393f))
+                outbox.skipped = 0
+            try:
+                await outbox.channel.send(embeds=embeds)
+            except (Forbidden, NotFound):
+                # The channel is gone or hidden, dropping what is left.
+                outbox.embeds.clear()
+            except HTTPException as error:
+                self.logger.error(f"[LOG] Unable to send {len(embeds)} events to {outbox.channel.id}: {error}")
+
+    async def close(self) -> None:
+        """
+        Sends what is still queued.
+        """
+        await gather(*(outbox.task for outbox in self._outboxes.values()
+                       if outbox.task is not None and not outbox.task.done()), return_exceptions=True)
@@ -0,0 +1,98 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from asyncio import Semaphore, Task, create_task, gather
+from typing import Any, Awaitable, Callable
+
+
+class Lane(object):
+    __slots__ = ('semaphore', 'jobs')
+
+    def __init__(self, concurrency: int):
+        self.semaphore = Semaphore(concurrency)
+        # Jobs started and not finished yet, the lane is dropped at zero.
+        self.jobs: int = 0
+
+
+class Executor(object):
+    __slots__ = ('concurrency', 'guild_concurrency', '_semaphore', '_lanes')
+
+    def __init__(self, concurrency: int = 16, guild_concurrency: int = 1):
+        """
+        Runs jobs of many guilds side by side with bounded concurrency.
+
+        Jobs of the same guild start in the order they were given, even
+        when they were given by different calls.
+
+        :param concurrency:`int` Jobs running at once across every guild.
+        :param guild_concurrency:`int` Jobs running at once inside one guild.
+        """
+        self.concurrency = concurrency
+        self.guild_concurrency = guild_concurrency
+        self._semaphore = Semaphore(concurrency)
+        self._lanes: dict[int, Lane] = {}
+
+    def start(self, guild_id: int, job: Any, worker: Callable[[Any], Awaitable[tuple[int, int]]],
+              failures: Callable[[Any], int] | None = None) -> Task:
+        """
+        Starts `worker` on one job, it waits behind the earlier jobs of its guild only.
+
+        :param guild_id:`int` Guild of the job.
+        :param worker: Coroutine function called with the job, returns its done and failed counts.
+        :param failures: Failed count of a job that raised, one when None.
+
+        :return:`asyncio.Task` Gives the done and failed counts of the job.
+        """
+        lane = self._lanes.get(guild_id)
+        if lane is None:
+            lane = self._lanes[guild_id] = Lane(concurrency=self.guild_concurrency)
+        lane.jobs += 1
+        return create_task(self._job(guild_id=guild_id, lane=lane, job=job, worker=worker, failures=failures))
+
+    async def run(self, groups: dict[int, list[Any]], worker: Callable[[Any], Awaitable[tuple[int, int]]],
+                  failures: Callable[[Any], int] | None = None) -> tuple[int, int]:
+        """
+        Runs `worker` on every job and adds up the counts it returns.
+
+        :param groups:`dict` Jobs keyed by guild id.
+
+        :return:`tuple[int, int]` Sums of the done and failed counts.
+        """
+        results = await gather(*[self.start(guild_id=guild_id, job=job, worker=worker, failures=failures)
+                                 for guild_id, jobs in groups.items() for job in jobs])
+        return sum(result[0] for result in results), sum(result[1] for result in results)
+
+    async def _job(self, guild_id: int, lane: Lane, job: Any, worker: Callable[[Any], Awaitable[tuple[int, int]]],
+                   failures: Callable[[Any], int] | None) -> tuple[int, int]:
+        try:
+            # The guild slot is taken first so one guild can not hold every global slot waiting.
+            async with lane.semaphore:
+                async with self._semaphore:
+                    return await worker(job)
+        except Exception:
+            return 0, 1 if failures is None else failures(job)
+        finally:
+            lane.jobs -= 1
+            if lane.jobs == 0:
+                del self._lanes[guild_id]
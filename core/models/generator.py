@@ -0,0 +1,114 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from secrets import token_bytes
+from string import ascii_uppercase, digits
+from math import expm1
+
+
+class CodeGenerator(object):
+    __slots__ = ('alphabet', 'length', 'groups', 'prefix', 'separator', '_table', '_reject', '_accept')
+
+    def __init__(self, alphabet: str = ascii_uppercase + digits, length: int = 4, groups: int = 5,
+                 prefix: str = "", separator: str = "-"):
+        """
+        Random codes such as `PREFIX-ABCD-1234`, drawn from the system CSPRNG.
+
+        Random bytes are fetched in bulk and mapped to the alphabet with
+        `bytes.translate`, bytes above the largest multiple of the alphabet
+        size are dropped so every character is equally likely.
+
+        :param alphabet:`str` ASCII characters a code is made of.
+        :param length:`int` Characters per group.
+        :param groups:`int` Groups per code.
+        :param prefix:`str` Text put before every code, followed by the separator.
+        :param separator:`str` Text put between the groups.
+        """
+        if not (alphabet.isascii() and 1 < len(alphabet) <= 256 and len(set(alphabet)) == len(alphabet)):
+            raise ValueError("alphabet must hold 2 to 256 distinct ASCII characters.")
+        if length < 1 or groups < 1:
+            raise ValueError("length and groups must be positive.")
+        self.alphabet = alphabet
+        self.length = length
+        self.groups = groups
+        self.prefix = prefix
+        self.separator = separator
+        size = len(alphabet)
+        # Bytes from `_accept` upward would favour the first characters.
+        self._accept: int = 256 - 256 % size
+        self._table: bytes = bytes(ord(alphabet[byte % size]) for byte in range(256))
+        self._reject: bytes = bytes(range(self._accept, 256))
+
+    @property
+    def space(self) -> int:
+        """
+        Number of different codes.
+        """
+        return len(self.alphabet) ** (self.length * self.groups)
+
+    def characters(self, n: int) -> str:
+        """
+        :return:`str` `n` uniformly random characters of the alphabet.
+        """
+        chunks: list[bytes] = []
+        missing = n
+        while missing > 0:
+            # Asking a little more than needed so one round is nearly always enough.
+            data = token_bytes(missing * 256 // self._accept + 16).translate(self._table, self._reject)
+            chunks.append(data[:missing])
+            missing -= len(chunks[-1])
+        return b"".join(chunks).decode("ascii")
+
+    def generate(self, count: int = 1, groups: int | None = None) -> list[str]:
+        """
+        Generates `count` codes, never twice the same one in a call.
+
+        :param groups:`int` Groups per code, `self.groups` when None.
+        :return:`list[str]`
+        :raises ValueError: `count` is larger than the number of different codes.
+        """
+        groups = self.groups if groups is None else groups
+        width = self.length * groups
+        if count > len(self.alphabet) ** width:
+            raise ValueError(f"only {len(self.alphabet) ** width} different codes can be generated.")
+        # A dict keeps the generation order while dropping repeats.
+        codes: dict[str, None] = {}
+        while len(codes) < count:
+            missing = count - len(codes)
+            # Chunking with zip and map keeps the per code work in C.
+            chunks = map("".join, zip(*[iter(self.characters(n=missing * width))] * self.length))
+            batch = map(self.separator.join, zip(*[chunks] * groups))
+            if self.prefix:
+                batch = map((self.prefix + self.separator).__add__, batch)
+            codes.update(dict.fromkeys(batch))
+        return list(codes)
+
+    def collision_probability(self, existing: int, count: int = 1) -> float:
+        """
+        Chance that at least one of `count` new codes clashes with `existing` ones.
+
+        :return:`float`
+        """
+        pairs = count * existing + count * (count - 1) / 2
+        return -expm1(-pairs / self.space)
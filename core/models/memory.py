@@ -0,0 +1,322 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from contextlib import asynccontextmanager
+from heapq import heapify, heappush, heappop
+from itertools import takewhile
+from time import time, perf_counter
+from typing import AsyncIterator, Iterator, NamedTuple
+from .errors import Errors
+from .storage import Storage
+from .records import Guild, Code, Claim, Redemption, ExpiredRole
+from .scheduler import Scheduler
+from .cache import GuildCache
+from .metrics import Metrics
+from .profiler import Profiler
+
+
+class _Redeemed(NamedTuple):
+    user_id: int
+    role_id: int
+    code_id: int
+    expires_at: int | None
+    redeemed_at: int
+
+
+class MemoryState(object):
+    __slots__ = ('guilds', 'codes', 'ids', 'redemptions', 'users', 'expiries', 'stale', 'last_code',
+                 'last_redemption')
+
+    def __init__(self):
+        """
+        Everything the memory engine stores, shared by the MemoryDatabase of a pool.
+        """
+        # guild id -> log channel.
+        self.guilds: dict[int, int | None] = {}
+        # guild id -> code -> Code, in creation order.
+        self.codes: dict[int, dict[str, Code]] = {}
+        # code id -> (guild id, code).
+        self.ids: dict[int, tuple[int, str]] = {}
+        # redemption rowid -> redemption, in redeem order.
+        self.redemptions: dict[int, _Redeemed] = {}
+        # code id -> user id -> redemption rowid.
+        self.users: dict[int, dict[int, int]] = {}
+        # (expires_at, rowid) heap of the pending role expiries.
+        self.expiries: list[tuple[int, int]] = []
+        # Entries of the heap whose redemption was removed, rebuilt once they are half of it.
+        self.stale: int = 0
+        self.last_code: int = 0
+        self.last_redemption: int = 0
+
+
+class MemoryDatabase(Storage):
+    __slots__ = ('state', 'scheduler')
+
+    def __init__(self, state: MemoryState, scheduler: Scheduler | None = None):
+        """
+        Storage engine keeping everything in dicts and a heap, lost when the process stops.
+
+        Each method runs without awaiting in between its checks and its
+        changes, so concurrent commands never see half of a change.
+        """
+        self.state = state
+        self.scheduler = scheduler
+
+    async def get_guilds(self) -> list[Guild]:
+        return [Guild(id=guild_id, channel_id=channel_id) for guild_id, channel_id in self.state.guilds.items()]
+
+    async def get_guild(self, guild_id: int) -> Guild:
+        return Guild(id=guild_id, channel_id=self.state.guilds.setdefault(guild_id, None))
+
+    async def set_channel(self, guild_id: int, channel_id: int) -> bool:
+        current = self.state.guilds.get(guild_id)
+        new_channel = None if (guild_id in self.state.guilds and current == channel_id) else channel_id
+        self.state.guilds[guild_id] = new_channel
+        return new_channel is not None
+
+    async def iter_codes(self) -> AsyncIterator[tuple[int, str]]:
+        for guild_id, codes in list(self.state.codes.items()):
+            for code in list(codes):
+                yield guild_id, code
+
+    async def code_exists(self, guild_id: int, code: str) -> bool:
+        return code in self.state.codes.get(guild_id, ())
+
+    async def get_code(self, guild_id: int, code: str) -> Code:
+        found = self.state.codes.get(guild_id, {}).get(code)
+        if found is None:
+            raise Errors.CodeNotFound(code=code)
+        return found
+
+    async def count_codes(self, guild_id: int) -> int:
+        return len(self.state.codes.get(guild_id, ()))
+
+    async def existing_codes(self, guild_id: int, codes: set[str]) -> set[str]:
+        return codes & self.state.codes.get(guild_id, {}).keys()
+
+    async def redeem(self, guild_id: int, code: str, user_id: int) -> Claim:
+        state = self.state
+        now = int(time())
+        found = state.codes.get(guild_id, {}).get(code)
+        if found is None:
+            raise Errors.CodeNotFound(code=code)
+        if found.max_uses is not None and found.uses_count >= found.max_uses:
+            raise Errors.CodeExpired(code=code)
+        if found.expires_at is not None and now >= found.expires_at:
+            raise Errors.CodeExpired(code=code)
+        users = state.users.setdefault(found.id, {})
+        if user_id in users:
+            raise Errors.CodeAlreadyUsed(code=code)
+        state.codes[guild_id][code] = found._replace(uses_count=found.uses_count + 1)
+        expires_at = None if found.role_expire_time is None else now + found.role_expire_time
+        state.last_redemption += 1
+        state.redemptions[state.last_redemption] = _Redeemed(user_id=user_id, role_id=found.role_id, code_id=found.id,
+                                                             expires_at=expires_at, redeemed_at=now)
+        users[user_id] = state.last_redemption
+        if expires_at is not None:
+            heappush(state.expiries, (expires_at, state.last_redemption))
+            if self.scheduler is not None:
+                self.scheduler.schedule(deadline=expires_at)
+        return Claim(guild=await self.get_guild(guild_id=guild_id), role_id=found.role_id,
+                     role_expire_time=found.role_expire_time)
+
+    def _add_codes(self, guild_id: int, codes: list[tuple[str, int | None, int | None, int, int | None]]) -> None:
+        """
+        Adds (code, expires_at, max_uses, role_id, role_expire_time) rows.
+        """
+        state = self.state
+        now = int(time())
+        guild_codes = state.codes.setdefault(guild_id, {})
+        for code, expires_at, max_uses, role_id, role_expire_time in codes:
+            state.last_code += 1
+            guild_codes[code] = Code(id=state.last_code, code=code, guild_id=guild_id, expires_at=expires_at,
+                                     max_uses=max_uses, uses_count=0, role_id=role_id,
+                                     role_expire_time=role_expire_time, created_at=now)
+            state.ids[state.last_code] = (guild_id, code)
+
+    async def create_code(self, guild_id: int, code: str, expire_in: int | None, max_uses: int | None,
+                          role_id: int, role_expire_time: int | None) -> Guild:
+        guild = await self.get_guild(guild_id=guild_id)
+        if code in self.state.codes.get(guild_id, ()):
+            raise Errors.CodeIsAlreadyExists(code=code)
+        self._add_codes(guild_id=guild_id, codes=[(code, expire_in, max_uses, role_id, role_expire_time)])
+        return guild
+
+    async def create_codes(self, guild_id: int, codes: list[str], expire_in: int | None,
+                           max_uses: int | None, role_id: int, role_expire_time: int | None) -> Guild:
+        guild = await self.get_guild(guild_id=guild_id)
+        # All or nothing, as the unique index does for the SQLite engine.
+        for code in codes:
+            if code in self.state.codes.get(guild_id, ()):
+                raise Errors.CodeIsAlreadyExists(code=code)
+        self._add_codes(guild_id=guild_id,
+                        codes=[(code, expire_in, max_uses, role_id, role_expire_time) for code in codes])
+        return guild
+
+    async def import_codes(self, guild_id: int, rows: list[tuple[int, dict]]) -> list[tuple[int, str]]:
+        await self.get_guild(guild_id=guild_id)
+        existing = self.state.codes.get(guild_id, {})
+        errors: list[tuple[int, str]] = []
+        values: dict[str, tuple] = {}
+        for line, row in rows:
+            if row["code"] in existing or row["code"] in values:
+                errors.append((line, f"Code {row['code']} is already exists."))
+                continue
+            values[row["code"]] = (row["code"], row["expires_at"], row["max_uses"], row["role"], row["role_duration"])
+        self._add_codes(guild_id=guild_id, codes=list(values.values()))
+        return errors
+
+    async def export_codes(self, guild_id: int) -> AsyncIterator[Code]:
+        for code in list(self.state.codes.get(guild_id, {}).values()):
+            yield code
+
+    async def export_redemptions(self, guild_id: int) -> AsyncIterator[Redemption]:
+        state = self.state
+        for redeemed in list(state.redemptions.values()):
+            key = state.ids.get(redeemed.code_id)
+            if key is not None and key[0] == guild_id:
+                yield Redemption(user_id=redeemed.user_id, code=key[1], role_id=redeemed.role_id,
+                                 expires_at=redeemed.expires_at, redeemed_at=redeemed.redeemed_at)
+
+    async def remove_code(self, guild_id: int, code: str) -> Guild:
+        guild = await self.get_guild(guild_id=guild_id)
+        found = self.state.codes.get(guild_id, {}).pop(code, None)
+        if found is None:
+            raise Errors.CodeNotFound(code=code)
+        del self.state.ids[found.id]
+        self._discard(rowids=list(self.state.users.pop(found.id, {}).values()))
+        return guild
+
+    def _discard(self, rowids: list[int]) -> None:
+        """
+        Removes redemptions and keeps the expiry heap from filling up with their entries.
+        """
+        state = self.state
+        for rowid in rowids:
+            redeemed = state.redemptions.pop(rowid, None)
+            if redeemed is None:
+                continue
+            state.users.get(redeemed.code_id, {}).pop(redeemed.user_id, None)
+            if redeemed.expires_at is not None:
+                state.stale += 1
+        # The sweep removes the earliest ones, so most are at the top.
+        while state.expiries and state.expiries[0][1] not in state.redemptions:
+            heappop(state.expiries)
+            state.stale -= 1
+        if state.stale * 2 > len(state.expiries):
+            state.expiries = [entry for entry in state.expiries if entry[1] in state.redemptions]
+            heapify(state.expiries)
+            state.stale = 0
+
+    def _pending(self) -> Iterator[tuple[int, int]]:
+        """
+        Walks the expiry heap in order without changing it, only as far as it is read.
+        """
+        state = self.state
+        heap = state.expiries
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            entry, i = heappop(frontier)
+            if entry[1] in state.redemptions:
+                yield entry
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heappush(frontier, (heap[child], child))
+
+    def _due(self, now: int) -> list[tuple[int, int]]:
+        return list(takewhile(lambda entry: entry[0] <= now, self._pending()))
+
+    async def next_expiries(self, limit: int) -> list[int]:
+        deadlines: list[int] = []
+        for expires_at, _ in self._pending():
+            if len(deadlines) >= limit:
+                break
+            if not deadlines or deadlines[-1] != expires_at:
+                deadlines.append(expires_at)
+        return deadlines
+
+    async def count_expired(self, now: int) -> int:
+        return len(self._due(now=now))
+
+    async def expired_roles(self, now: int, page_size: int = 500) -> AsyncIterator[list[ExpiredRole]]:
+        state = self.state
+        due = self._due(now=now)
+        for i in range(0, len(due), page_size):
+            rows: list[ExpiredRole] = []
+            for expires_at, rowid in due[i:i + page_size]:
+                redeemed = state.redemptions.get(rowid)
+                if redeemed is None:
+                    continue
+                key = state.ids.get(redeemed.code_id)
+                guild_id = None if key is None else key[0]
+                rows.append(ExpiredRole(rowid=rowid, expires_at=expires_at, guild_id=guild_id,
+                                        channel_id=state.guilds.get(guild_id), user_id=redeemed.user_id,
+                                        role_id=redeemed.role_id))
+            if rows:
+                yield rows
+
+    async def delete_redemptions(self, rowids: list[int]) -> None:
+        self._discard(rowids=rowids)
+
+
+class MemoryPool(object):
+    __slots__ = ('metrics', 'version', 'profiler', 'scheduler', 'guilds', 'state')
+
+    def __init__(self, metrics: Metrics | None = None):
+        """
+        Lends MemoryDatabase instances over one shared state, in place of Pool.
+
+        :param metrics:`Metrics` Records the time operations hold the storage.
+        """
+        self.metrics = metrics
+        # No schema to upgrade.
+        self.version: int = 0
+        # Stays empty, kept so the statement report works with any engine.
+        self.profiler = Profiler()
+        self.scheduler = Scheduler()
+        self.guilds = GuildCache()
+        self.state = MemoryState()
+
+    async def open(self) -> None:
+        return None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[MemoryDatabase]:
+        """
+        :return:`MemoryDatabase`
+        """
+        acquired = perf_counter()
+        try:
+            yield MemoryDatabase(state=self.state, scheduler=self.scheduler)
+        finally:
+            if self.metrics is not None:
+                self.metrics.db_wait.observe(0.0, connection="memory")
+                self.metrics.db_hold.observe(perf_counter() - acquired, connection="memory")
+
+    async def warm_up(self) -> None:
+        async with self.acquire() as db:
+            self.guilds.load(guilds=await db.get_guilds())
+
+    async def close(self) -> None:
+        return None
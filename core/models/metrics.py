@@ -0,0 +1,195 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from asyncio import StreamReader, StreamWriter, start_server, Server, TimeoutError, wait_for
+from bisect import bisect_left
+from logging import Handler, LogRecord
+
+# Seconds, from a fast cache hit to a reply close to the interaction deadline.
+BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Writes per commit, up to the largest WRITE_BATCH worth setting.
+BATCH_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[object, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter(object):
+    __slots__ = ('name', 'help', 'labels', '_values')
+
+    kind: str = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labels), 0)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    __slots__ = ()
+
+    kind: str = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[tuple(str(labels[name]) for name in self.labels)] = value
+
+
+class Histogram(object):
+    __slots__ = ('name', 'help', 'labels', 'buckets', '_values')
+
+    kind: str = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # Per label set, the count of each bucket then the sum of the observations.
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        if key not in self._values:
+            self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = self._values[key]
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def samples(self) -> list[str]:
+        lines: list[str] = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels((*self.labels, 'le'), (*key, bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total[0]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Metrics(object):
+    __slots__ = ('commands', 'outcomes', 'db_wait', 'db_hold', 'db_batch', 'db_batch_size', 'loop_duration',
+                 'loop_roles', 'backlog', 'lag', 'requests', 'rate_limits', '_server')
+
+    def __init__(self):
+        """
+        Metrics of the bot, served in the Prometheus text format.
+        """
+        self.commands = Histogram("discode_command_seconds", "Slash command handling time.", ("command",))
+        self.outcomes = Counter("discode_command_outcomes_total", "Slash command results.", ("command", "outcome"))
+        # connection is "read" for the pooled connections, "write" for the writer and "memory" without sqlite.
+        self.db_wait = Histogram("discode_db_wait_seconds", "Time spent waiting for a database connection.",
+                                 ("connection",))
+        self.db_hold = Histogram("discode_db_seconds", "Time a database connection is used per operation.",
+                                 ("connection",))
+        self.db_batch = Histogram("discode_db_write_batch_seconds", "Time a batch of writes takes to commit.")
+        self.db_batch_size = Histogram("discode_db_write_batch_size", "Writes committed together.",
+                                       buckets=BATCH_BUCKETS)
+        self.loop_duration = Histogram("discode_expiry_loop_seconds", "Duration of an expiry loop iteration.")
+        self.loop_roles = Counter("discode_expired_roles_total", "Expired roles handled.", ("result",))
+        self.backlog = Gauge("discode_expiry_backlog", "Due redemptions when the last sweep started.")
+        self.lag = Gauge("discode_expiry_lag_seconds", "How late the last sweep started behind the earliest deadline.")
+        self.requests = Counter("discode_discord_requests_total", "Discord API responses.", ("method", "status"))
+        self.rate_limits = Counter("discode_discord_rate_limits_total", "Discord API 429 responses.", ("scope",))
+        self._server: Server | None = None
+
+    def render(self) -> str:
+        """
+        :return:`str` Every metric in the Prometheus text format.
+        """
+        lines: list[str] = []
+        for metric in (self.commands, self.outcomes, self.db_wait, self.db_hold, self.db_batch, self.db_batch_size,
+                       self.loop_duration, self.loop_roles, self.backlog, self.lag, self.requests, self.rate_limits):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, reader: StreamReader, writer: StreamWriter) -> None:
+        try:
+            request = await wait_for(reader.readline(), timeout=5)
+            # Skipping the headers.
+            while (line := await wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", self.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9100) -> None:
+        """
+        Serves GET /metrics on a local port.
+        """
+        self._server = await start_server(self._handle, host=host, port=port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+class RequestCounter(Handler):
+    def __init__(self, metrics: Metrics):
+        """
+        Counts the Discord API responses from the discord.http debug log.
+        """
+        super().__init__()
+        self.metrics = metrics
+
+    def emit(self, record: LogRecord) -> None:
+        if not isinstance(record.msg, str):
+            return
+        if record.msg == "%s %s with %s has returned %s":
+            self.metrics.requests.inc(method=record.args[0], status=record.args[3])
+        elif record.msg.startswith("We are being rate limited."):
+            self.metrics.rate_limits.inc(scope="route")
+        elif record.msg.startswith("Global rate limit has been hit."):
+            self.metrics.rate_limits.inc(scope="global")
@@ -0,0 +1,213 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from aiosqlite import Connection
+
+# Ordered schema steps, (version, description, statements).
+# Never edit a released step, append a new one instead.
+MIGRATIONS: list[tuple[int, str, tuple[str, ...]]] = [
+    (1, "Initial tables", (
+        # guilds(*id, created_at)
+        """CREATE TABLE IF NOT EXISTS guilds(
+                                    id INTEGER PRIMARY KEY,
+                                    channel INTEGER,
+                                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL);
+                                    """,
+        # Roles(*id, role_id, expire_time)
+        """CREATE TABLE IF NOT EXISTS roles(
+                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    role_id INTEGER NOT NULL,
+                                    expire_time INTEGER);
+                                    """,
+        # Codes(*id, code, expires_at, max_uses, uses_count, **role_id, **guild_id, created_at)
+        """CREATE TABLE IF NOT EXISTS codes(
+                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    code TEXT NOT NULL,
+                                    expires_at TIMESTAMP,
+                                    max_uses INTEGER,
+                                    uses_count INTEGER DEFAULT 0,
+                                    role_id INTEGER NOT NULL,
+                                    guild_id INTEGER NOT NULL,
+                                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                                    FOREIGN KEY(guild_id) REFERENCES guilds(id),
+                                    FOREIGN KEY(role_id) REFERENCES roles(id));
+                                    """,
+        # Redemption(user_id, **role_id, **code_id, expires_at, redeemed_at)
+        """CREATE TABLE IF NOT EXISTS redemption(
+                                    user_id INTEGER NOT NULL,
+                                    role_id INTEGER NOT NULL,
+                                    code_id INTEGER NOT NULL,
+                                    expires_at TIMESTAMP,
+                                    redeemed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                                    FOREIGN KEY (code_id) REFERENCES codes(id),
+                                    FOREIGN KEY (role_id) REFERENCES roles(id));
+                                    """,
+    )),
+    (2, "Indexes for the code lookup, duplicate check and expiry scan", (
+        # Older databases may hold the same code twice, keep the first one. Redemptions of
+        # the others move to it, their roles would never expire otherwise.
+        """UPDATE redemption SET code_id = (
+                                    SELECT MIN(kept.id) FROM codes AS dropped
+                                    JOIN codes AS kept ON kept.guild_id = dropped.guild_id AND kept.code = dropped.code
+                                    WHERE dropped.id = redemption.code_id)
+                                    WHERE code_id IN (SELECT id FROM codes WHERE id NOT IN (
+                                    SELECT MIN(id) FROM codes GROUP BY guild_id, code));""",
+        """DELETE FROM codes WHERE id NOT IN (SELECT MIN(id) FROM codes GROUP BY guild_id, code);""",
+        """CREATE UNIQUE INDEX IF NOT EXISTS codes_guild_code ON codes(guild_id, code);""",
+        """CREATE INDEX IF NOT EXISTS redemption_code_user ON redemption(code_id, user_id);""",
+        """CREATE INDEX IF NOT EXISTS redemption_expires_at ON redemption(expires_at)
+                                    WHERE expires_at IS NOT NULL;""",
+    )),
+    (3, "Timestamps stored as integer UTC epoch seconds", (
+        # Column types and defaults can only change by rebuilding the table. expires_at was written
+        # in local time and the CURRENT_TIMESTAMP defaults in UTC, the 'utc' modifier converts the first.
+        """CREATE TABLE guilds_epoch(
+                                    id INTEGER PRIMARY KEY,
+                                    channel INTEGER,
+                                    created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)) NOT NULL);
+                                    """,
+        """INSERT INTO guilds_epoch(id, channel, created_at)
+                                    SELECT id, channel, CAST(strftime('%s', created_at) AS INTEGER) FROM guilds;""",
+        """DROP TABLE guilds;""",
+        """ALTER TABLE guilds_epoch RENAME TO guilds;""",
+        """CREATE TABLE codes_epoch(
+                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    code TEXT NOT NULL,
+                                    expires_at INTEGER,
+                                    max_uses INTEGER,
+                                    uses_count INTEGER DEFAULT 0,
+                                    role_id INTEGER NOT NULL,
+                                    guild_id INTEGER NOT NULL,
+                                    created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)) NOT NULL,
+                                    FOREIGN KEY(guild_id) REFERENCES guilds(id),
+                                    FOREIGN KEY(role_id) REFERENCES roles(id));
+                                    """,
+        """INSERT INTO codes_epoch(id, code, expires_at, max_uses, uses_count, role_id, guild_id, created_at)
+                                    SELECT id, code, CAST(strftime('%s', expires_at, 'utc') AS INTEGER), max_uses,
+                                    uses_count, role_id, guild_id, CAST(strftime('%s', created_at) AS INTEGER)
+                                    FROM codes;""",
+        # Ids of deleted codes are never handed out again.
+        """DELETE FROM sqlite_sequence WHERE name = 'codes_epoch';""",
+        """INSERT INTO sqlite_sequence(name, seq)
+                                    SELECT 'codes_epoch', seq FROM sqlite_sequence WHERE name = 'codes';""",
+        """DROP TABLE codes;""",
+        """ALTER TABLE codes_epoch RENAME TO codes;""",
+        """CREATE UNIQUE INDEX codes_guild_code ON codes(guild_id, code);""",
+        """CREATE TABLE redemption_epoch(
+                                    user_id INTEGER NOT NULL,
+                                    role_id INTEGER NOT NULL,
+                                    code_id INTEGER NOT NULL,
+                                    expires_at INTEGER,
+                                    redeemed_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)) NOT NULL,
+                                    FOREIGN KEY (code_id) REFERENCES codes(id),
+                                    FOREIGN KEY (role_id) REFERENCES roles(id));
+                                    """,
+        """INSERT INTO redemption_epoch(rowid, user_id, role_id, code_id, expires_at, redeemed_at)
+                                    SELECT rowid, user_id, role_id, code_id,
+                                    CAST(strftime('%s', expires_at, 'utc') AS INTEGER),
+                                    CAST(strftime('%s', redeemed_at) AS INTEGER) FROM redemption;""",
+        """DROP TABLE redemption;""",
+        """ALTER TABLE redemption_epoch RENAME TO redemption;""",
+        """CREATE INDEX redemption_code_user ON redemption(code_id, user_id);""",
+        """CREATE INDEX redemption_expires_at ON redemption(expires_at) WHERE expires_at IS NOT NULL;""",
+    )),
+    (4, "Role of a code stored in the code and redemption rows", (
+        # Every code had its own roles row, codes and redemptions now hold the Discord role id.
+        # Rows pointing at a missing role could never be redeemed nor expired, they are dropped.
+        """CREATE TABLE codes_roles(
+                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    code TEXT NOT NULL,
+                                    expires_at INTEGER,
+                                    max_uses INTEGER,
+                                    uses_count INTEGER DEFAULT 0,
+                                    role_id INTEGER NOT NULL,
+                                    role_expire_time INTEGER,
+                                    guild_id INTEGER NOT NULL,
+                                    created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)) NOT NULL,
+                                    FOREIGN KEY(guild_id) REFERENCES guilds(id));
+                                    """,
+        """INSERT INTO codes_roles(id, code, expires_at, max_uses, uses_count, role_id, role_expire_time, guild_id,
+                                    created_at)
+                                    SELECT codes.id, codes.code, codes.expires_at, codes.max_uses, codes.uses_count,
+                                    roles.role_id, roles.expire_time, codes.guild_id, codes.created_at
+                                    FROM codes JOIN roles ON roles.id = codes.role_id;""",
+        # Ids of deleted codes are never handed out again.
+        """DELETE FROM sqlite_sequence WHERE name = 'codes_roles';""",
+        """INSERT INTO sqlite_sequence(name, seq)
+                                    SELECT 'codes_roles', seq FROM sqlite_sequence WHERE name = 'codes';""",
+        """CREATE TABLE redemption_roles(
+                                    user_id INTEGER NOT NULL,
+                                    role_id INTEGER NOT NULL,
+                                    code_id INTEGER NOT NULL,
+                                    expires_at INTEGER,
+                                    redeemed_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)) NOT NULL,
+                                    FOREIGN KEY (code_id) REFERENCES codes(id));
+                                    """,
+        """INSERT INTO redemption_roles(rowid, user_id, role_id, code_id, expires_at, redeemed_at)
+                                    SELECT redemption.rowid, redemption.user_id, roles.role_id, redemption.code_id,
+                                    redemption.expires_at, redemption.redeemed_at
+                                    FROM redemption JOIN roles ON roles.id = redemption.role_id;""",
+        """DROP TABLE redemption;""",
+        """DROP TABLE codes;""",
+        """DROP TABLE roles;""",
+        """ALTER TABLE codes_roles RENAME TO codes;""",
+        """ALTER TABLE redemption_roles RENAME TO redemption;""",
+        """CREATE UNIQUE INDEX codes_guild_code ON codes(guild_id, code);""",
+        """CREATE INDEX redemption_code_user ON redemption(code_id, user_id);""",
+        """CREATE INDEX redemption_expires_at ON redemption(expires_at) WHERE expires_at IS NOT NULL;""",
+    )),
+]
+
+
+async def migrate(connection: Connection) -> int:
+    """
+    Upgrades the database to the latest schema version in place.
+
+    Each step runs in its own transaction together with its version row,
+    so an interrupted upgrade resumes from the last applied step.
+
+    :return:`int` The current schema version.
+    """
+    await connection.execute("""CREATE TABLE IF NOT EXISTS schema_version(
+                                    version INTEGER PRIMARY KEY,
+                                    description TEXT NOT NULL,
+                                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL);
+                                    """)
+    get_version = await connection.execute("""SELECT MAX(version) FROM schema_version;""")
+    current = (await get_version.fetchone())[0] or 0
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            await connection.execute("""BEGIN;""")
+            for sql in statements:
+                await connection.execute(sql)
+            await connection.execute("""INSERT INTO schema_version(version, description) VALUES(?, ?);""",
+                                     (version, description))
+            await connection.commit()
+        except Exception:
+            await connection.rollback()
+            raise
+        current = version
+    return current
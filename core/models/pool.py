@@ -0,0 +1,197 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from aiosqlite import connect, Connection
+from asyncio import Queue
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from time import perf_counter
+from .database import Database
+from .migrations import migrate
+from .scheduler import Scheduler
+from .cache import GuildCache, CodeCache
+from .bloom import CodeFilter
+from .metrics import Metrics
+from .profiler import Profiler
+from .writer import Writer
+
+# Set on every connection in WAL mode, cache_size is in KiB when negative and mmap_size in bytes.
+WAL_PRAGMAS: dict[str, int | str] = {"synchronous": "NORMAL", "cache_size": -16_000, "mmap_size": 268_435_456,
+                                     "busy_timeout": 5_000}
+
+
+class Pool(object):
+    __slots__ = ('database', 'size', 'version', 'metrics', 'group_commit', 'batch', 'window', 'wal', 'pragmas',
+                 'writer', 'profiler', 'scheduler', 'guilds', 'codes', 'filters', '_connections', '_queue', '_lent')
+
+    def __init__(self, database: str = "guilds.db", size: int = 4, metrics: Metrics | None = None,
+                 group_commit: bool = True, batch: int = 100, window: float = 0.002, wal: bool = True,
+                 pragmas: dict[str, int | str] | None = None):
+        """
+        Long-lived database connections shared by the cogs.
+
+        :param database:`str` Path of the sqlite database.
+        :param size:`int` Number of connections kept open.
+        :param metrics:`Metrics` Records the connection wait and use times.
+        :param group_commit:`bool` Runs every write on one extra connection, committed in batches.
+        :param batch:`int` Writes committed together at most.
+        :param window:`float` Seconds the writer waits for more writes before committing.
+        :param wal:`bool` Journals in WAL mode so reads never wait for the writer, nor the writer for reads.
+        :param pragmas:`dict` Replaces `WAL_PRAGMAS`.
+        """
+        self.database = database
+        self.size = size
+        self.metrics = metrics
+        self.group_commit = group_commit
+        self.batch = batch
+        self.window = window
+        self.wal = wal
+        self.pragmas = WAL_PRAGMAS if pragmas is None else pragmas
+        self.writer: Writer | None = None
+        # statement timings and the slow statement log.
+        self.profiler = Profiler()
+        self.version: int = 0
+        # role expiry deadlines, fed by redeem.
+        self.scheduler = Scheduler()
+        # guild settings, warmed up at ready.
+        self.guilds = GuildCache()
+        # code lookups of /redeem and /code.
+        self.codes = CodeCache()
+        # existing codes per guild, rebuilt when the pool opens.
+        self.filters = CodeFilter()
+        self._connections: list[Connection] = []
+        self._queue: Queue | None = None
+        # When each lent connection was taken, for the hold time.
+        self._lent: dict[Connection, float] = {}
+
+    async def _connect(self, **kwargs) -> Connection:
+        connection = await connect(database=self.database, **kwargs)
+        if self.wal:
+            # The journal mode is stored in the database file, the others are per connection.
+            await connection.execute("PRAGMA journal_mode = WAL;")
+            for name, value in self.pragmas.items():
+                await connection.execute(f"PRAGMA {name} = {value};")
+        return connection
+
+    async def open(self) -> None:
+        """
+        Opens the connections and upgrades the schema once.
+
+        With group commit the lent connections only read, every write goes
+        through the writer connection.
+        """
+        self._queue = Queue()
+        if not self.wal:
+            # WAL is kept by the database file, turning it off needs the only connection.
+            async with connect(database=self.database) as connection:
+                await connection.execute("PRAGMA journal_mode = DELETE;")
+        for _ in range(self.size):
+            self._connections.append(await self._connect())
+        self.version = await migrate(connection=self._connections[0])
+        if self.group_commit:
+            # Transactions of the writer are handled by hand, one per batch.
+            connection = await self._connect(isolation_level=None)
+            self.writer = Writer(connection=connection, factory=self._database, window=self.window, batch=self.batch,
+                                 metrics=self.metrics)
+            self.writer.start()
+        for connection in self._connections:
+            if self.writer is not None:
+                # A write that bypasses the writer fails loudly instead of taking the write lock.
+                await connection.execute("PRAGMA query_only = ON;")
+            self._queue.put_nowait(connection)
+        await self.load_filters()
+
+    def _database(self, connection: Connection | None = None, hooks: list | None = None) -> Database:
+        # Without a connection the database borrows one of the pool when it first needs it.
+        return Database(connection=connection, scheduler=self.scheduler, guilds=self.guilds, codes=self.codes,
+                        filters=self.filters, profiler=self.profiler, writer=self.writer, hooks=hooks,
+                        pool=self if connection is None else None)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Database]:
+        """
+        Gives a database for a single operation.
+
+        A connection is borrowed on its first statement and handed back
+        before a write waits on the writer, so queued writes never hold
+        the connections the reads need.
+
+        :return:`Database`
+        """
+        async with self._database() as db:
+            yield db
+
+    async def lend(self) -> Connection:
+        """
+        Takes a connection, waiting until one is free.
+
+        :return:`aiosqlite.Connection`
+        """
+        started = perf_counter()
+        connection: Connection = await self._queue.get()
+        self._lent[connection] = perf_counter()
+        if self.metrics is not None:
+            self.metrics.db_wait.observe(self._lent[connection] - started, connection="read")
+        return connection
+
+    async def release(self, connection: Connection) -> None:
+        """
+        Puts back a connection taken by `lend`.
+        """
+        try:
+            # Never hand back a connection holding an open transaction.
+            if connection.in_transaction:
+                await connection.rollback()
+        finally:
+            self._queue.put_nowait(connection)
+            lent = self._lent.pop(connection)
+            if self.metrics is not None:
+                self.metrics.db_hold.observe(perf_counter() - lent, connection="read")
+
+    async def load_filters(self) -> None:
+        """
+        Rebuilds the code filters from the database.
+        """
+        filters = CodeFilter()
+        async with self.acquire() as db:
+            async for guild_id, code in db.iter_codes():
+                filters.add(guild_id=guild_id, code=code)
+        filters.loaded = True
+        self.filters = filters
+
+    async def warm_up(self) -> None:
+        """
+        Loads the settings of every guild into the cache in one query.
+        """
+        async with self.acquire() as db:
+            self.guilds.load(guilds=await db.get_guilds())
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            await self.writer.close()
+            await self.writer.connection.close()
+            self.writer = None
+        for connection in self._connections:
+            await connection.close()
+        self._connections.clear()
@@ -0,0 +1,189 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from aiosqlite import Connection, Cursor
+from logging import Logger, getLogger
+from time import perf_counter
+from re import compile
+
+_SPACES = compile(r"\s+")
+# IN lists of any length count as the same statement.
+_IN_LIST = compile(r"IN \((?:\?,? ?)+\)")
+
+
+class Stats(object):
+    __slots__ = ('count', 'total', 'max', 'rows')
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.rows: int = 0
+
+
+class Query(object):
+    __slots__ = ('profiler', 'connection', 'cursor', 'sql', 'parameters', 'stats', 'elapsed', 'slow')
+
+    def __init__(self, profiler: "Profiler", connection: Connection, cursor: Cursor, sql: str,
+                 parameters: tuple, stats: Stats):
+        """
+        Cursor of one statement, its fetches are timed as part of the statement.
+        """
+        self.profiler = profiler
+        self.connection = connection
+        self.cursor = cursor
+        self.sql = sql
+        self.parameters = parameters
+        self.stats = stats
+        self.elapsed: float = 0.0
+        self.slow: bool = False
+
+    @property
+    def lastrowid(self) -> int | None:
+        return self.cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount
+
+    async def fetchone(self):
+        started = perf_counter()
+        row = await self.cursor.fetchone()
+        await self.profiler.observe(query=self, seconds=perf_counter() - started, rows=row is not None)
+        return row
+
+    async def fetchmany(self, size: int) -> list:
+        started = perf_counter()
+        rows = await self.cursor.fetchmany(size)
+        await self.profiler.observe(query=self, seconds=perf_counter() - started, rows=len(rows))
+        return rows
+
+    async def fetchall(self) -> list:
+        started = perf_counter()
+        rows = await self.cursor.fetchall()
+        await self.profiler.observe(query=self, seconds=perf_counter() - started, rows=len(rows))
+        return rows
+
+
+class Profiler(object):
+    __slots__ = ('threshold', 'explain', 'logger', 'stats', 'plans', '_shapes')
+
+    def __init__(self, threshold: float = 0.1, explain: bool = False, logger: Logger | None = None):
+        """
+        Time, calls and rows of every statement shape run by Database.
+
+        :param threshold:`float` Seconds after which a statement is logged as slow.
+        :param explain:`bool` Captures the query plan of the first slow run of each shape.
+        :param logger:`logging.Logger` Receives the slow statements.
+        """
+        self.threshold = threshold
+        self.explain = explain
+        self.logger = logger or getLogger("discode")
+        self.stats: dict[str, Stats] = {}
+        self.plans: dict[str, list[str]] = {}
+        self._shapes: dict[str, str] = {}
+
+    def shape(self, sql: str) -> str:
+        """
+        :return:`str` The statement on one line, IN lists collapsed.
+        """
+        shape = self._shapes.get(sql)
+        if shape is None:
+            shape = _IN_LIST.sub("IN (...)", _SPACES.sub(" ", sql).strip())
+            if len(self._shapes) < 1024:
+                self._shapes[sql] = shape
+        return shape
+
+    async def execute(self, connection: Connection, cursor: Cursor, sql: str, parameters: tuple = ()) -> Query:
+        started = perf_counter()
+        await cursor.execute(sql, parameters)
+        shape = self.shape(sql)
+        stats = self.stats.get(shape)
+        if stats is None:
+            stats = self.stats[shape] = Stats()
+        stats.count += 1
+        query = Query(profiler=self, connection=connection, cursor=cursor, sql=sql, parameters=parameters,
+                      stats=stats)
+        await self.observe(query=query, seconds=perf_counter() - started, rows=0)
+        return query
+
+    async def executemany(self, connection: Connection, cursor: Cursor, sql: str, parameters: list) -> Query:
+        started = perf_counter()
+        await cursor.executemany(sql, parameters)
+        shape = self.shape(sql)
+        stats = self.stats.get(shape)
+        if stats is None:
+            stats = self.stats[shape] = Stats()
+        stats.count += 1
+        query = Query(profiler=self, connection=connection, cursor=cursor, sql=sql,
+                      parameters=parameters[0] if parameters else (), stats=stats)
+        await self.observe(query=query, seconds=perf_counter() - started, rows=0)
+        return query
+
+    async def observe(self, query: Query, seconds: float, rows: int) -> None:
+        stats = query.stats
+        query.elapsed += seconds
+        stats.total += seconds
+        stats.rows += rows
+        if query.elapsed > stats.max:
+            stats.max = query.elapsed
+        if not query.slow and query.elapsed >= self.threshold:
+            query.slow = True
+            await self.report_slow(query=query)
+
+    async def report_slow(self, query: Query) -> None:
+        shape = self.shape(query.sql)
+        # Only the types of the values are logged, codes and ids stay private.
+        parameters = ", ".join(type(value).__name__ for value in query.parameters)
+        self.logger.warning(f"[DB] Slow statement ({query.elapsed * 1000:.1f}ms): {shape} ({parameters})")
+        if self.explain and shape not in self.plans:
+            try:
+                get_plan = await query.connection.execute(f"EXPLAIN QUERY PLAN {query.sql}", query.parameters)
+                self.plans[shape] = [row[-1] for row in await get_plan.fetchall()]
+                await get_plan.close()
+            except Exception as error:
+                self.plans[shape] = [f"unavailable: {error}"]
+            if self.plans[shape]:
+                self.logger.warning(f"[DB] Plan: {' | '.join(self.plans[shape])}")
+
+    def report(self, top: int = 10, sort: str = "total") -> str:
+        """
+        :param sort:`str` total, avg, max, count or rows.
+        :return:`str` The `top` statement shapes as a text table.
+        """
+        def key(stats: Stats) -> float:
+            return stats.total / stats.count if sort == "avg" else getattr(stats, sort)
+
+        ranked = sorted(self.stats.items(), key=lambda item: key(item[1]), reverse=True)[:top]
+        lines = [f"{'calls':>8} {'total ms':>10} {'avg ms':>8} {'max ms':>8} {'rows':>8}  statement"]
+        for shape, stats in ranked:
+            lines.append(f"{stats.count:>8} {stats.total * 1000:>10.1f} {stats.total / stats.count * 1000:>8.2f} "
+                         f"{stats.max * 1000:>8.2f} {stats.rows:>8}  {shape}")
+            if self.plans.get(shape):
+                lines.append(f"{'':>46}plan: {' | '.join(self.plans[shape])}")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        self.stats.clear()
+        self.plans.clear()
@@ -0,0 +1,91 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from functools import cache
+from sqlite3 import Cursor
+from typing import Callable, NamedTuple
+
+
+class Guild(NamedTuple):
+    """
+    Settings of a guild.
+    """
+    id: int
+    channel_id: int | None
+
+
+class Code(NamedTuple):
+    """
+    A code with its role, `role_id` being the Discord role given on redeem.
+    """
+    id: int
+    code: str
+    guild_id: int
+    expires_at: int | None
+    max_uses: int | None
+    uses_count: int
+    role_id: int
+    role_expire_time: int | None
+    created_at: int
+
+
+class Claim(NamedTuple):
+    """
+    A successful redeem, the role to give and where to log it.
+    """
+    guild: Guild
+    role_id: int
+    role_expire_time: int | None
+
+
+class Redemption(NamedTuple):
+    """
+    One redeem of a code by a user, as exported.
+    """
+    user_id: int
+    code: str
+    role_id: int
+    expires_at: int | None
+    redeemed_at: int
+
+
+class ExpiredRole(NamedTuple):
+    """
+    A role due to be taken back from a user.
+    """
+    rowid: int
+    expires_at: int
+    guild_id: int | None
+    channel_id: int | None
+    user_id: int
+    role_id: int
+
+
+@cache
+def row_factory(record: type[NamedTuple]) -> Callable[[Cursor, tuple], NamedTuple]:
+    """
+    :return: A sqlite3 row factory building `record` from the selected columns, in field order.
+    """
+    make = record._make
+    return lambda cursor, row: make(row)
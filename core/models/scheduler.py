@@ -0,0 +1,103 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from asyncio import Event, wait_for, TimeoutError
+from time import time
+from heapq import heappush, heappop, nsmallest, heapify
+
+
+class Scheduler(object):
+    __slots__ = ('limit', 'stale', '_deadlines', '_wakeup')
+
+    def __init__(self, limit: int = 1024):
+        """
+        Keeps the next role expiry deadlines in memory.
+
+        The heap only holds the earliest `limit` deadlines, when it runs
+        dry after being trimmed it is marked stale and reloaded from the
+        database.
+
+        :param limit:`int` Number of deadlines kept after a reload.
+        """
+        self.limit = limit
+        # Nothing is known until the first reload.
+        self.stale: bool = True
+        self._deadlines: list[int] = []
+        self._wakeup = Event()
+
+    @property
+    def next(self) -> int | None:
+        return self._deadlines[0] if self._deadlines else None
+
+    def load(self, deadlines: list[int]) -> None:
+        """
+        Replaces the heap with deadlines read from the database, in epoch seconds.
+        """
+        self._deadlines = list(deadlines)
+        heapify(self._deadlines)
+        # A full page means there may be more rows after the last one.
+        self.stale = len(self._deadlines) >= self.limit
+        self._wakeup.set()
+
+    def schedule(self, deadline: int) -> None:
+        """
+        Adds a new deadline, wakes the waiter up if it is the earliest one.
+        """
+        earliest = self.next
+        heappush(self._deadlines, deadline)
+        if len(self._deadlines) > self.limit * 2:
+            self._deadlines = nsmallest(self.limit, self._deadlines)
+            self.stale = True
+        if earliest is None or deadline < earliest:
+            self._wakeup.set()
+
+    def pop_due(self, now: int) -> int:
+        """
+        Drops every deadline that is not later than `now`.
+
+        :return:`int` Number of dropped deadlines.
+        """
+        count: int = 0
+        while self._deadlines and self._deadlines[0] <= now:
+            heappop(self._deadlines)
+            count += 1
+        return count
+
+    async def wait(self) -> None:
+        """
+        Sleeps until the earliest deadline is due.
+        """
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._deadlines:
+                timeout = self._deadlines[0] - time()
+                if timeout <= 0:
+                    return
+            elif self.stale:
+                return
+            try:
+                await wait_for(self._wakeup.wait(), timeout=timeout)
+            except TimeoutError:
+                return
@@ -0,0 +1,161 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+from .records import Guild, Code, Claim, Redemption, ExpiredRole
+
+
+class Storage(ABC):
+    """
+    Operations the cogs run against the stored guilds, codes and redemptions.
+
+    Engines implement every abstract method, a missing one fails as soon
+    as the engine is created. They are used as an async context manager
+    lent by their pool, timestamps are epoch seconds and missing or
+    unusable codes raise the exceptions of `Errors`.
+    """
+    __slots__ = ()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+    @abstractmethod
+    async def get_guilds(self) -> list[Guild]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_guild(self, guild_id: int) -> Guild:
+        """
+        :return:`Guild` The settings of the guild, created on first use.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_channel(self, guild_id: int, channel_id: int) -> bool:
+        """
+        Sets the log channel, setting the same channel again turns logging off.
+
+        :return:`bool` True when logging is on.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_codes(self) -> AsyncIterator[tuple[int, str]]:
+        """
+        Streams (guild_id, code) of every code.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def code_exists(self, guild_id: int, code: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_code(self, guild_id: int, code: str) -> Code:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_codes(self, guild_id: int) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def existing_codes(self, guild_id: int, codes: set[str]) -> set[str]:
+        """
+        :return:`set[str]` Which of `codes` already exist.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def redeem(self, guild_id: int, code: str, user_id: int) -> Claim:
+        """
+        Claims one use of a code for a user, never more than its max uses.
+
+        :return:`Claim`
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_code(self, guild_id: int, code: str, expire_in: int | None, max_uses: int | None,
+                          role_id: int, role_expire_time: int | None) -> Guild:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_codes(self, guild_id: int, codes: list[str], expire_in: int | None,
+                           max_uses: int | None, role_id: int, role_expire_time: int | None) -> Guild:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def import_codes(self, guild_id: int, rows: list[tuple[int, dict]]) -> list[tuple[int, str]]:
+        """
+        :param rows:`list` (line, row) pairs, see core.models.transfer.parse_codes.
+        :return:`list[tuple[int, str]]` (line, reason) of the skipped rows.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def export_codes(self, guild_id: int) -> AsyncIterator[Code]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def export_redemptions(self, guild_id: int) -> AsyncIterator[Redemption]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def remove_code(self, guild_id: int, code: str) -> Guild:
+        """
+        Removes a code and its redemptions, the roles already given are kept.
+
+        :return:`Guild`
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def next_expiries(self, limit: int) -> list[int]:
+        """
+        :return:`list[int]` The earliest pending role expiry deadlines.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_expired(self, now: int) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def expired_roles(self, now: int) -> AsyncIterator[list[ExpiredRole]]:
+        """
+        Walks the due redemptions page by page in deadline order, the
+        redemptions of removed codes come with a None guild_id.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_redemptions(self, rowids: list[int]) -> None:
+        """
+        Forgets redemptions handled by the expiry loop.
+        """
+        raise NotImplementedError
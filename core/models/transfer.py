@@ -0,0 +1,177 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from csv import DictReader, writer
+from datetime import datetime, timezone
+from io import StringIO
+from json import loads, dumps, JSONDecodeError
+from typing import AsyncIterator, Iterable, Iterator
+from .pool import Pool
+
+# Imported codes read code, role, expires_at, max_uses and role_duration (seconds),
+# extra columns such as uses_count are ignored so an export can be imported back.
+EXPORT_FIELDS = {"codes": ("code", "role", "expires_at", "max_uses", "uses_count", "role_duration", "created_at"),
+                 "redemptions": ("user_id", "code", "role", "expires_at", "redeemed_at")}
+# Stored as epoch seconds, written as ISO dates with their UTC offset.
+TIMESTAMP_FIELDS = ("expires_at", "created_at", "redeemed_at")
+# Record attribute of the exported columns named differently.
+_ATTRIBUTES = {"role": "role_id", "role_duration": "role_expire_time"}
+FORMATS = ("csv", "jsonl")
+
+
+def _optional_int(value) -> int | None:
+    if value is None or value == "":
+        return None
+    value = int(value)
+    if value < 0:
+        raise ValueError
+    return value
+
+
+def parse_row(raw: dict) -> dict:
+    """
+    Validates one imported code.
+
+    :return:`dict` The row with typed values.
+    """
+    code = str(raw.get("code") or "").strip()
+    if not code or len(code) > 100:
+        raise ValueError("code must hold 1 to 100 characters")
+    try:
+        role = int(raw.get("role"))
+    except (TypeError, ValueError):
+        raise ValueError("role must be a role id")
+    expires_at = raw.get("expires_at")
+    try:
+        # Dates without an offset are read in local time.
+        expires_at = int(datetime.fromisoformat(expires_at).timestamp()) if expires_at else None
+    except (TypeError, ValueError):
+        raise ValueError("expires_at must look like 2030-01-01 12:00:00")
+    try:
+        max_uses = _optional_int(raw.get("max_uses"))
+        role_duration = _optional_int(raw.get("role_duration"))
+    except (TypeError, ValueError):
+        raise ValueError("max_uses and role_duration must be positive numbers")
+    return {"code": code, "role": role, "expires_at": expires_at, "max_uses": max_uses,
+            "role_duration": role_duration}
+
+
+def parse_codes(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """
+    Parses codes one line at a time.
+
+    :return: (line, row, None) for a valid row or (line, None, reason) otherwise.
+    """
+    if fmt == "csv":
+        reader = DictReader(lines)
+        for raw in reader:
+            try:
+                yield reader.line_num, parse_row(raw=raw), None
+            except ValueError as error:
+                yield reader.line_num, None, str(error)
+    else:
+        for line, text in enumerate(lines, start=1):
+            if not text.strip():
+                continue
+            try:
+                raw = loads(text)
+                if not isinstance(raw, dict):
+                    raise ValueError("line must be a JSON object")
+                yield line, parse_row(raw=raw), None
+            except JSONDecodeError:
+                yield line, None, "invalid JSON"
+            except ValueError as error:
+                yield line, None, str(error)
+
+
+def _csv_line(values: list) -> str:
+    buffer = StringIO()
+    writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def format_header(fields: tuple[str, ...], fmt: str) -> str:
+    """
+    :return:`str` The CSV header line, JSONL has none.
+    """
+    return _csv_line(values=list(fields)) if fmt == "csv" else ""
+
+
+def format_row(record: tuple, fields: tuple[str, ...], fmt: str) -> str:
+    """
+    :param record:`Code | Redemption`
+    :return:`str` One CSV or JSONL line.
+    """
+    row = {field: getattr(record, _ATTRIBUTES.get(field, field)) for field in fields}
+    for field in TIMESTAMP_FIELDS:
+        if row.get(field) is not None:
+            row[field] = datetime.fromtimestamp(row[field], tz=timezone.utc).isoformat(sep=" ")
+    if fmt == "csv":
+        return _csv_line(values=["" if row[field] is None else row[field] for field in fields])
+    return dumps({field: row[field] for field in fields}, default=str) + "\n"
+
+
+async def import_codes(pool: Pool, guild_id: int, lines: Iterable[str], fmt: str,
+                       chunk: int = 1000) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Streams codes into a guild, each chunk is committed on its own.
+
+    :return:`tuple` Number of imported codes and (line, reason) of the skipped rows.
+    """
+    imported: int = 0
+    errors: list[tuple[int, str]] = []
+    rows: list[tuple[int, dict]] = []
+
+    async def flush() -> None:
+        nonlocal imported
+        async with pool.acquire() as db:
+            skipped = await db.import_codes(guild_id=guild_id, rows=rows)
+        imported += len(rows) - len(skipped)
+        errors.extend(skipped)
+        rows.clear()
+
+    for line, row, error in parse_codes(lines=lines, fmt=fmt):
+        if error is not None:
+            errors.append((line, error))
+            continue
+        rows.append((line, row))
+        if len(rows) >= chunk:
+            await flush()
+    if rows:
+        await flush()
+    return imported, errors
+
+
+async def export(pool: Pool, guild_id: int, table: str, fmt: str) -> AsyncIterator[str]:
+    """
+    Streams the codes or the redemptions of a guild as CSV or JSONL lines.
+    """
+    fields = EXPORT_FIELDS[table]
+    if header := format_header(fields=fields, fmt=fmt):
+        yield header
+    async with pool.acquire() as db:
+        rows = db.export_codes(guild_id=guild_id) if table == "codes" else \
+            db.export_redemptions(guild_id=guild_id)
+        async for record in rows:
+            yield format_row(record=record, fields=fields, fmt=fmt)
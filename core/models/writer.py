@@ -0,0 +1,170 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from aiosqlite import Connection
+from asyncio import Future, Queue, Task, TimeoutError, create_task, get_running_loop, wait_for, CancelledError
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+from .database import Database
+from .metrics import Metrics
+
+# (operation, future, perf_counter when it was queued) of a write.
+Request = tuple[Callable[[Database], Awaitable[Any]], Future, float]
+
+
+class Writer(object):
+    __slots__ = ('connection', 'factory', 'window', 'batch', 'metrics', 'batches', 'requests', '_queue', '_task')
+
+    def __init__(self, connection: Connection, factory: Callable[..., Database], window: float = 0.002,
+                 batch: int = 100, metrics: Metrics | None = None):
+        """
+        Single task running every write, many requests share one commit.
+
+        Each request runs in its own savepoint, a failing request is rolled
+        back alone and its caller gets its error, the others still commit.
+        Callers are answered and the caches updated only after the commit.
+
+        :param connection:`aiosqlite.Connection` Opened with isolation_level=None.
+        :param factory: Builds the Database used for a batch, given the connection and the hooks.
+        :param window:`float` Seconds to wait for more requests after the first one.
+        :param batch:`int` Requests committed together at most.
+        :param metrics:`Metrics` Records how long writes wait and run, and the batches.
+        """
+        self.connection = connection
+        self.factory = factory
+        self.window = window
+        self.batch = batch
+        self.metrics = metrics
+        # Commits and requests so far, their ratio is the average batch size.
+        self.batches: int = 0
+        self.requests: int = 0
+        self._queue: Queue[Request] = Queue()
+        self._task: Task | None = None
+
+    def start(self) -> None:
+        self._task = create_task(self._run())
+
+    async def submit(self, operation: Callable[[Database], Awaitable[Any]]) -> Any:
+        """
+        Queues a write and waits for its commit.
+
+        :param operation: Coroutine function given the Database of the batch.
+        :return: What the operation returned.
+        """
+        future = get_running_loop().create_future()
+        self._queue.put_nowait((operation, future, perf_counter()))
+        return await future
+
+    async def _collect(self) -> list[Request]:
+        requests = [await self._queue.get()]
+        deadline = get_running_loop().time() + self.window
+        while len(requests) < self.batch:
+            if not self._queue.empty():
+                requests.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                requests.append(await wait_for(self._queue.get(), timeout=timeout))
+            except TimeoutError:
+                break
+        return requests
+
+    async def _run(self) -> None:
+        while True:
+            requests = await self._collect()
+            # close() queues a None operation after the last write.
+            stop = any(operation is None for operation, _, _ in requests)
+            requests = [request for request in requests if request[0] is not None]
+            try:
+                if requests:
+                    await self._commit(requests=requests)
+            except CancelledError:
+                for _, future, _ in requests:
+                    if not future.done():
+                        future.cancel()
+                raise
+            if stop:
+                return
+
+    async def _commit(self, requests: list[Request]) -> None:
+        # (future, result, error, hooks) of every request.
+        done: list[tuple[Future, Any, BaseException | None, list[Callable[[], None]]]] = []
+        began = perf_counter()
+        try:
+            await self.connection.execute("""BEGIN IMMEDIATE;""")
+            for operation, future, queued in requests:
+                if future.done():
+                    # The caller gave up waiting.
+                    continue
+                started = perf_counter()
+                hooks: list[Callable[[], None]] = []
+                await self.connection.execute("""SAVEPOINT request;""")
+                try:
+                    async with self.factory(connection=self.connection, hooks=hooks) as db:
+                        result = await operation(db)
+                except Exception as error:
+                    await self.connection.execute("""ROLLBACK TO request;""")
+                    await self.connection.execute("""RELEASE request;""")
+                    done.append((future, None, error, []))
+                else:
+                    await self.connection.execute("""RELEASE request;""")
+                    done.append((future, result, None, hooks))
+                if self.metrics is not None:
+                    self.metrics.db_wait.observe(started - queued, connection="write")
+                    self.metrics.db_hold.observe(perf_counter() - started, connection="write")
+            await self.connection.execute("""COMMIT;""")
+        except Exception as error:
+            # Nothing of the batch was written.
+            if self.connection.in_transaction:
+                await self.connection.execute("""ROLLBACK;""")
+            for _, future, _ in requests:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.batches += 1
+        self.requests += len(done)
+        if self.metrics is not None:
+            self.metrics.db_batch.observe(perf_counter() - began)
+            self.metrics.db_batch_size.observe(len(done))
+        for future, result, error, hooks in done:
+            for hook in hooks:
+                hook()
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """
+        Finishes the queued writes and stops.
+        """
+        if self._task is None:
+            return
+        self._queue.put_nowait((None, None, perf_counter()))
+        await self._task
+        self._task = None
@@ -26,8 +26,10 @@ DEALINGS IN THE SOFTWARE.
 from discord import Embed
 
 # ------ Generating code ------
-from secrets import choice
-from string import ascii_uppercase, digits
+from .models import CodeGenerator
+
+# Shared by every call, a generator builds its translation tables once.
+_generator = CodeGenerator()
 
 
 def text_to_seconds(text: str) -> int:
@@ -84,20 +86,9 @@ def embed_wrong(msg: str) -> Embed:
     return embed
 
 
-def gen_rnd_string(
-        n: int = 4
-) -> str:
-    return ''.join(
-        choice(
-            ascii_uppercase + digits
-        )
-        for _ in range(n)
-    )
+def gen_rnd_string(n: int = 4) -> str:
+    return _generator.characters(n=n)
 
 
-def generate_code(
-        n: int = 5
-) -> str:
-    return "-".join(
-        gen_rnd_string() for _ in range(n)
-    )
+def generate_code(n: int = 5) -> str:
+    return _generator.generate(count=1, groups=n)[0]
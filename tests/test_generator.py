@@ -0,0 +1,45 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from core.models import CodeGenerator
+import pytest
+
+
+def test_generate_every_code():
+    generator = CodeGenerator(alphabet="ABC", length=1, groups=2)
+    assert sorted(generator.generate(count=generator.space)) == \
+           [f"{first}-{second}" for first in "ABC" for second in "ABC"]
+
+
+def test_generate_more_than_the_space():
+    generator = CodeGenerator(alphabet="ABC", length=1, groups=2)
+    with pytest.raises(ValueError):
+        generator.generate(count=generator.space + 1)
+    with pytest.raises(ValueError):
+        generator.generate(count=28, groups=3)
+
+
+def test_generate_prefix():
+    code = CodeGenerator(length=4, groups=2, prefix="PRE").generate(count=1)[0]
+    assert code.startswith("PRE-") and len(code.split("-")) == 3
@@ -0,0 +1,120 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from core.models.migrations import MIGRATIONS, migrate
+# ------ Database ------
+from aiosqlite import connect
+from sqlite3 import connect as connect_sync
+# ------ Datetime ------
+from calendar import timegm
+from datetime import datetime
+import time
+# ------ Async ------
+from asyncio import run
+import pytest
+
+
+@pytest.fixture
+def local_time(monkeypatch):
+    # expires_at was written in local time, a zone away from UTC makes the conversion visible.
+    if not hasattr(time, "tzset"):
+        pytest.skip("time zones can only be changed on Unix")
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def baseline(path: str) -> None:
+    """
+    Builds a database as the bot wrote it before schema versions existed.
+    """
+    connection = connect_sync(path)
+    for sql in MIGRATIONS[0][2]:
+        connection.execute(sql)
+    connection.execute("""INSERT INTO guilds(id, channel, created_at) VALUES(10, 20, '2023-01-02 03:04:05');""")
+    connection.executemany("""INSERT INTO roles(id, role_id, expire_time) VALUES(?, ?, ?);""",
+                           [(1, 111, 3600), (2, 222, None), (3, 333, 60)])
+    connection.executemany("""INSERT INTO codes(id, code, expires_at, max_uses, uses_count, role_id, guild_id,
+                              created_at) VALUES(?, ?, ?, ?, ?, ?, ?, ?);""",
+                           [(1, "AAA", "2024-05-06 07:08:09", 5, 2, 1, 10, "2023-01-02 03:04:05"),
+                            (2, "BBB", None, None, 1, 2, 10, "2023-01-03 00:00:00"),
+                            # Duplicate of AAA, dropped by step 2.
+                            (3, "AAA", None, None, 1, 3, 10, "2023-01-04 00:00:00"),
+                            (4, "CCC", None, None, 0, 2, 10, "2023-01-05 00:00:00")])
+    # The last code was removed, its id must not be handed out again.
+    connection.execute("""DELETE FROM codes WHERE id = 4;""")
+    connection.executemany("""INSERT INTO redemption(rowid, user_id, role_id, code_id, expires_at, redeemed_at)
+                              VALUES(?, ?, ?, ?, ?, ?);""",
+                           [(1, 7, 1, 1, "2024-05-06 08:00:00", "2024-05-06 11:00:00"),
+                            (2, 8, 2, 2, None, "2024-05-07 00:00:00"),
+                            (3, 9, 3, 3, "2024-05-08 00:00:00", "2024-05-07 23:59:00")])
+    connection.commit()
+    connection.close()
+
+
+async def upgrade(path: str) -> tuple[int, int]:
+    async with connect(database=path) as connection:
+        first = await migrate(connection=connection)
+        second = await migrate(connection=connection)
+    return first, second
+
+
+def test_migrate_baseline(tmp_path, local_time):
+    path = str(tmp_path / "guilds.db")
+    baseline(path=path)
+    latest = MIGRATIONS[-1][0]
+    assert run(upgrade(path=path)) == (latest, latest)
+
+    connection = connect_sync(path)
+    try:
+        assert connection.execute("""SELECT version FROM schema_version ORDER BY version;""").fetchall() == \
+               [(version,) for version, _, _ in MIGRATIONS]
+        tables = {row[0] for row in connection.execute("""SELECT name FROM sqlite_master WHERE type = 'table';""")}
+        assert "roles" not in tables
+        indexes = {row[0] for row in connection.execute("""SELECT name FROM sqlite_master WHERE type = 'index';""")}
+        assert {"codes_guild_code", "redemption_code_user", "redemption_expires_at"} <= indexes
+
+        # created_at and redeemed_at were UTC, expires_at local time.
+        assert connection.execute("""SELECT id, channel, created_at FROM guilds;""").fetchall() == \
+               [(10, 20, timegm((2023, 1, 2, 3, 4, 5)))]
+        assert connection.execute("""SELECT id, code, expires_at, max_uses, uses_count, role_id, role_expire_time,
+                                     guild_id, created_at FROM codes ORDER BY id;""").fetchall() == \
+               [(1, "AAA", int(datetime(2024, 5, 6, 7, 8, 9).timestamp()), 5, 2, 111, 3600, 10,
+                 timegm((2023, 1, 2, 3, 4, 5))),
+                (2, "BBB", None, None, 1, 222, None, 10, timegm((2023, 1, 3, 0, 0, 0)))]
+        # The redemption of the dropped duplicate points at the kept code and keeps its own role.
+        assert connection.execute("""SELECT rowid, user_id, role_id, code_id, expires_at, redeemed_at
+                                     FROM redemption ORDER BY rowid;""").fetchall() == \
+               [(1, 7, 111, 1, int(datetime(2024, 5, 6, 8).timestamp()), timegm((2024, 5, 6, 11, 0, 0))),
+                (2, 8, 222, 2, None, timegm((2024, 5, 7, 0, 0, 0))),
+                (3, 9, 333, 1, int(datetime(2024, 5, 8).timestamp()), timegm((2024, 5, 7, 23, 59, 0)))]
+
+        assert connection.execute("""SELECT seq FROM sqlite_sequence WHERE name = 'codes';""").fetchone() == (4,)
+        connection.execute("""INSERT INTO codes(code, role_id, guild_id) VALUES('DDD', 111, 10);""")
+        assert connection.execute("""SELECT id, created_at FROM codes WHERE code = 'DDD';""").fetchone()[0] == 5
+        assert isinstance(connection.execute("""SELECT created_at FROM codes WHERE id = 5;""").fetchone()[0], int)
+    finally:
+        connection.close()
@@ -0,0 +1,108 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from core.models import Pool, MemoryPool, Errors
+from core.models.storage import Storage
+# ------ Async ------
+from asyncio import gather, run
+import pytest
+
+
+def engines(path) -> list:
+    return [Pool(database=str(path / "writer.db")),
+            Pool(database=str(path / "direct.db"), group_commit=False),
+            MemoryPool()]
+
+
+async def create_codes(pool, codes: list[str], guild_id: int = 1) -> str:
+    async with pool.acquire() as db:
+        try:
+            await db.create_codes(guild_id=guild_id, codes=codes, expire_in=None, max_uses=None, role_id=5,
+                                  role_expire_time=None)
+            return "created"
+        except Errors.CodeIsAlreadyExists as error:
+            return error.code
+
+
+@pytest.mark.parametrize("engine", range(3))
+def test_create_codes_duplicate(tmp_path, engine: int):
+    async def scenario():
+        pool = engines(tmp_path)[engine]
+        await pool.open()
+        try:
+            assert await create_codes(pool, codes=["A", "B"]) == "created"
+            # The first clash is reported and none of the codes are created.
+            assert await create_codes(pool, codes=["C", "B", "A"]) == "B"
+            async with pool.acquire() as db:
+                assert await db.existing_codes(guild_id=1, codes={"A", "B", "C"}) == {"A", "B"}
+            # Only one of many concurrent creations of the same code wins.
+            results = await gather(*(create_codes(pool, codes=[f"X{i}", "SAME"], guild_id=2) for i in range(5)))
+            assert sorted(results) == ["SAME"] * 4 + ["created"]
+        finally:
+            await pool.close()
+    run(scenario())
+
+
+async def redeem(pool, code: str, user_id: int) -> str:
+    async with pool.acquire() as db:
+        try:
+            await db.redeem(guild_id=1, code=code, user_id=user_id)
+            return "redeemed"
+        except (Errors.CodeExpired, Errors.CodeAlreadyUsed) as error:
+            return type(error).__name__
+
+
+@pytest.mark.parametrize("engine", range(3))
+def test_redeem_race(tmp_path, engine: int):
+    async def scenario():
+        pool = engines(tmp_path)[engine]
+        await pool.open()
+        try:
+            async with pool.acquire() as db:
+                for code, max_uses in (("RACE", 5), ("TWICE", 10)):
+                    await db.create_code(guild_id=1, code=code, expire_in=None, max_uses=max_uses, role_id=5,
+                                         role_expire_time=60)
+            # More users than uses, only max_uses of them get the role.
+            results = await gather(*(redeem(pool, code="RACE", user_id=user_id) for user_id in range(20)))
+            assert results.count("redeemed") == 5
+            assert results.count("CodeExpired") == 15
+            # One user clicking many times at once redeems once.
+            results = await gather(*(redeem(pool, code="TWICE", user_id=100) for _ in range(5)))
+            assert sorted(results) == ["CodeAlreadyUsed"] * 4 + ["redeemed"]
+            assert await redeem(pool, code="TWICE", user_id=100) == "CodeAlreadyUsed"
+            async with pool.acquire() as db:
+                assert (await db.get_code(guild_id=1, code="RACE")).uses_count == 5
+                assert (await db.get_code(guild_id=1, code="TWICE")).uses_count == 1
+        finally:
+            await pool.close()
+    run(scenario())
+
+
+def test_storage_is_abstract():
+    class Partial(Storage):
+        async def get_guilds(self):
+            return []
+
+    with pytest.raises(TypeError):
+        Partial()
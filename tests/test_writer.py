@@ -0,0 +1,70 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2022-present MrSniFo
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from core.models import Pool, Errors
+# ------ Async ------
+from asyncio import gather, run
+
+
+def test_failing_request_rolls_back_alone(tmp_path):
+    async def scenario():
+        # A wide window so every request below shares one batch.
+        pool = Pool(database=str(tmp_path / "guilds.db"), window=0.2)
+        await pool.open()
+        hooks: list[str] = []
+
+        async def create(code: str) -> str:
+            async with pool.acquire() as db:
+                try:
+                    await db.create_code(guild_id=1, code=code, expire_in=None, max_uses=None, role_id=5,
+                                         role_expire_time=None)
+                    return "created"
+                except Errors.CodeIsAlreadyExists:
+                    return "exists"
+
+        async def failing(db) -> None:
+            # Writes and registers a hook, then fails.
+            await db.execute("""INSERT INTO guilds(id, channel) VALUES(2, 3);""")
+            db.on_commit(lambda: hooks.append("failing"))
+            raise RuntimeError("failing request")
+
+        async def succeeding(db) -> None:
+            await db.execute("""INSERT INTO guilds(id, channel) VALUES(4, 5);""")
+            db.on_commit(lambda: hooks.append("succeeding"))
+
+        try:
+            batches = pool.writer.batches
+            results = await gather(create(code="A"), pool.writer.submit(failing), create(code="A"),
+                                   pool.writer.submit(succeeding), create(code="B"), return_exceptions=True)
+            assert pool.writer.batches == batches + 1
+            assert results[0] == "created" and results[2] == "exists" and results[4] == "created"
+            assert isinstance(results[1], RuntimeError) and results[3] is None
+            # The failed request left no row and its hook never ran.
+            assert hooks == ["succeeding"]
+            async with pool.acquire() as db:
+                assert [guild.id for guild in await db.get_guilds()] == [1, 4]
+                assert await db.existing_codes(guild_id=1, codes={"A", "B"}) == {"A", "B"}
+        finally:
+            await pool.close()
+    run(scenario())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+
+# Copyright (c) 2022-present MrSniFo
+
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+
+# Usage:
+#   python transfer.py import <guild_id> codes.csv
+#   python transfer.py export <guild_id> codes codes.csv
+#   python transfer.py export <guild_id> redemptions history.jsonl
+# The format follows the file extension (.csv or .jsonl).
+# Import while the bot is stopped, the running bot only learns about codes
+# added through its own commands until it is restarted.
+
+from core.models import Pool, transfer
+from asyncio import SelectorEventLoop, set_event_loop
+from argparse import ArgumentParser
+from pathlib import Path
+import sys
+
+
+def file_format(path: str) -> str:
+    return "jsonl" if Path(path).suffix.lower() in (".jsonl", ".json") else "csv"
+
+
+async def main(args) -> int:
+    pool = Pool(database=args.database, size=1)
+    await pool.open()
+    try:
+        if args.command == "import":
+            with open(args.file, "r", encoding="utf-8-sig", newline="") as fp:
+                imported, errors = await transfer.import_codes(pool=pool, guild_id=args.guild_id, lines=fp,
+                                                               fmt=file_format(args.file))
+            for line, reason in errors:
+                print(f"line {line}: {reason}", file=sys.stderr)
+            print(f"Imported {imported} codes, skipped {len(errors)} rows.")
+        else:
+            with open(args.file, "w", encoding="utf-8", newline="") as fp:
+                async for line in transfer.export(pool=pool, guild_id=args.guild_id, table=args.table,
+                                                  fmt=file_format(args.file)):
+                    fp.write(line)
+            print(f"Exported the {args.table} of {args.guild_id} to {args.file}.")
+    finally:
+        await pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Import and export codes of guilds.db.")
+    parser.add_argument("--database", default="guilds.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Import codes from a CSV or JSONL file.")
+    import_parser.add_argument("guild_id", type=int)
+    import_parser.add_argument("file")
+    export_parser = commands.add_parser("export", help="Export codes or redemptions to a CSV or JSONL file.")
+    export_parser.add_argument("guild_id", type=int)
+    export_parser.add_argument("table", choices=tuple(transfer.EXPORT_FIELDS))
+    export_parser.add_argument("file")
+
+    loop = SelectorEventLoop()
+    set_event_loop(loop)
+    try:
+        sys.exit(loop.run_until_complete(main(args=parser.parse_args())))
+    finally:
+        loop.close()